@@ -0,0 +1,568 @@
+import argparse
+import gzip
+import importlib.util
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from unittest import mock
+
+from botocore.exceptions import ClientError
+
+from fake_discovery import FakeDiscoveryClient, SyntheticFleet
+
+# Handler modules, relative to the backend directory
+HANDLERS = {
+    'discovery': 'lambda/discoveryProcessor/index.py',
+    'cost': 'lambda/costEstimator/index.py',
+    'roadmap': 'lambda/roadmapGenerator/index.py'
+}
+
+STAGES = ['discovery', 'cost', 'roadmap']
+TOPOLOGIES = ['cyclic', 'acyclic']
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+BASELINE_PATH = 'benchmarks/baseline.json'
+
+# Stages skipped above these fleet sizes by default: the roadmap's critical-path scan is quadratic
+DEFAULT_STAGE_LIMITS = {'roadmap': 10000}
+
+# Relative slowdown or growth tolerated before a metric counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+# Absolute changes ignored by the comparator, so sub-second stages don't flag timer noise
+NOISE_FLOORS = {'wallSeconds': 0.1, 'peakMemoryMb': 1.0, 'outputBytes': 0}
+
+# Deterministic metrics compared against the baseline; timings and memory use the tolerance
+EXACT_METRICS = ('statusCode', 'records')
+
+# Environment the handlers read, pointing at the fakes below
+HANDLER_ENVIRONMENT = {
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'DISCOVERY_TABLE': 'benchmark-discovery',
+    'S3_BUCKET': 'benchmark-bucket',
+    'COST_ESTIMATOR_FUNCTION': 'benchmark-costEstimator'
+}
+
+# Discovery processor concurrency used by every run
+DISCOVERY_CONCURRENCY = 8
+
+# Fixed roadmap start date, so roadmap payloads are comparable between runs
+ROADMAP_START_DATE = '2026-01-05'
+
+class CallCounter:
+    """Thread-safe per-operation call and byte counters shared by the fake clients"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        self.bytes = Counter()
+
+    def count(self, operation, size=0):
+        with self.lock:
+            self.calls[operation] += 1
+            self.bytes[operation] += size
+
+    def snapshot(self):
+        with self.lock:
+            return {'calls': dict(self.calls), 'bytes': dict(self.bytes)}
+
+class FakeS3Client:
+    """S3 stand-in that keeps bodies under the retained prefixes on disk, out of traced memory"""
+
+    def __init__(self, retain_prefixes=('dependency-graph/', 'raw-data/')):
+        self.counter = CallCounter()
+        self.retain_prefixes = retain_prefixes
+        self.directory = tempfile.TemporaryDirectory(prefix='benchmark-s3-')
+        self.objects = {}
+        self.uploads = {}
+
+    def close(self):
+        self.directory.cleanup()
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        body = Body.encode('utf-8') if isinstance(Body, str) else bytes(Body)
+        self.counter.count('put_object', len(body))
+        if Key.startswith(self.retain_prefixes):
+            with open(self._path(Key), 'wb') as f:
+                f.write(body)
+        return {}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self.counter.count('get_object')
+        if Key not in self.objects:
+            raise ClientError({'Error': {'Code': 'NoSuchKey', 'Message': Key}}, 'GetObject')
+        with open(self.objects[Key], 'rb') as f:
+            return {'Body': io.BytesIO(f.read())}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        self.counter.count('create_multipart_upload')
+        upload_id = f"upload-{len(self.uploads)}"
+        self.uploads[upload_id] = Key
+        if Key.startswith(self.retain_prefixes):
+            open(self._path(Key), 'wb').close()
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, **kwargs):
+        self.counter.count('upload_part', len(Body))
+        # The archiver uploads parts in order, so appending reassembles the object
+        if Key.startswith(self.retain_prefixes):
+            with open(self.objects[Key], 'ab') as f:
+                f.write(Body)
+        return {'ETag': f'"{UploadId}-{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, **kwargs):
+        self.counter.count('complete_multipart_upload')
+        self.uploads.pop(UploadId, None)
+        return {}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId, **kwargs):
+        self.counter.count('abort_multipart_upload')
+        self.uploads.pop(UploadId, None)
+        self.objects.pop(Key, None)
+        return {}
+
+    def _path(self, key):
+        path = self.objects[key] = os.path.join(self.directory.name, f"{len(self.objects)}.object")
+        return path
+
+class FakeBatchWriter:
+    """Buffers puts into 25-item BatchWriteItem calls, like the boto3 batch writer"""
+
+    BATCH_SIZE = 25
+
+    def __init__(self, table):
+        self.table = table
+        self.buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+    def put_item(self, Item):
+        self.buffer.append(Item)
+        if len(self.buffer) >= self.BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.table.resource.counter.count('batch_write_item')
+            for item in self.buffer:
+                self.table.items[(item['serverId'], item['timestamp'])] = item
+            self.buffer = []
+
+class FakeTable:
+    def __init__(self, resource, name):
+        self.resource = resource
+        self.name = name
+        self.items = {}
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return FakeBatchWriter(self)
+
+    def get_item(self, Key):
+        self.resource.counter.count('get_item')
+        item = self.items.get((Key['serverId'], Key['timestamp']))
+        return {'Item': item} if item else {}
+
+    def put_item(self, Item):
+        self.resource.counter.count('put_item')
+        self.items[(Item['serverId'], Item['timestamp'])] = Item
+        return {}
+
+class FakeDynamoDBResource:
+    """In-memory DynamoDB resource stand-in for the discovery table"""
+
+    def __init__(self):
+        self.counter = CallCounter()
+        self.tables = {}
+
+    def Table(self, name):
+        if name not in self.tables:
+            self.tables[name] = FakeTable(self, name)
+        return self.tables[name]
+
+    def batch_get_item(self, RequestItems):
+        self.counter.count('batch_get_item')
+        responses = {}
+        for name, request in RequestItems.items():
+            items = self.Table(name).items
+            responses[name] = [
+                items[(key['serverId'], key['timestamp'])] for key in request['Keys']
+                if (key['serverId'], key['timestamp']) in items
+            ]
+        return {'Responses': responses}
+
+class FakeLambdaClient:
+    """Lambda stand-in that invokes the in-process handlers by function name"""
+
+    def __init__(self, handlers):
+        self.counter = CallCounter()
+        self.handlers = handlers
+
+    def invoke(self, FunctionName, Payload, InvocationType='RequestResponse', **kwargs):
+        self.counter.count('invoke', len(Payload))
+        response = self.handlers[FunctionName](json.loads(Payload), None)
+        return {'StatusCode': 200, 'Payload': io.BytesIO(json.dumps(response).encode('utf-8'))}
+
+def load_handler(name, path):
+    """Import a handler module from its file, since every handler is named index.py"""
+    spec = importlib.util.spec_from_file_location(f"benchmark_{name}_handler", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def iter_archived_records(s3, manifest):
+    """Read back the records a discovery run archived, one chunk at a time"""
+    chunks = {}
+    for location in json.load(s3.get_object(Bucket=manifest['bucket'], Key=manifest['key'])['Body'])['servers'].values():
+        chunks.setdefault(location['key'], None)
+    for key in chunks:
+        # Each record is its own gzip member, and gzip reads concatenated members as one stream
+        lines = gzip.decompress(s3.get_object(Bucket=manifest['bucket'], Key=key)['Body'].read())
+        for line in lines.splitlines():
+            yield json.loads(line)
+
+def migration_server(record):
+    """Convert a discovery record into the server shape the cost and roadmap handlers take"""
+    basic = record.get('basic', {})
+    metrics = record.get('metrics', {})
+    memory = metrics.get('memory', {})
+    storage = metrics.get('storage', {})
+    mb = 1024 ** 2
+    return {
+        'serverId': basic.get('serverId'),
+        'serverName': basic.get('serverName'),
+        'serverType': basic.get('serverType', 'unknown'),
+        'metrics': {
+            'cpu': {
+                'cores': metrics.get('cpu', {}).get('cores', 0),
+                'utilization': metrics.get('cpu', {}).get('utilization', 0)
+            },
+            # The cost and roadmap handlers take sizes in MB
+            'memory': {
+                'total': memory.get('total', 0) / mb,
+                'used': memory.get('used', 0) / mb,
+                'utilization': memory.get('utilization', 0)
+            },
+            'storage': {'total': storage.get('total', 0) / mb, 'used': storage.get('used', 0) / mb}
+        },
+        'applications': record.get('applications', []),
+        'dependencies': [
+            {'serverId': dependency['serverId'], 'type': dependency.get('type')}
+            for dependency in record.get('dependencies', {}).get('direct', [])
+        ]
+    }
+
+class LambdaBenchmark:
+    def __init__(self, sizes=None, stages=None, seed=42, measure_memory=True, stage_limits=None,
+                 topologies=None):
+        self.sizes = sizes or DEFAULT_SIZES
+        self.stages = stages or STAGES
+        self.seed = seed
+        self.topologies = topologies or TOPOLOGIES[:1]
+        self.measure_memory = measure_memory
+        self.stage_limits = dict(DEFAULT_STAGE_LIMITS, **(stage_limits or {}))
+
+        for key, value in HANDLER_ENVIRONMENT.items():
+            os.environ.setdefault(key, value)
+        self.import_seconds = {}
+        self.handlers = {}
+        for name, path in HANDLERS.items():
+            start = time.perf_counter()
+            self.handlers[name] = load_handler(name, path)
+            self.import_seconds[name] = round(time.perf_counter() - start, 4)
+
+    def run(self):
+        """Run every stage at every fleet size"""
+        results = {}
+        for topology in self.topologies:
+            for size in self.sizes:
+                # Cyclic fleets keep the plain size key, so results stay comparable with older baselines
+                key = str(size) if topology == 'cyclic' else f"{size} {topology}"
+                print(f"Benchmarking {key} servers...")
+                fleet = SyntheticFleet(size, seed=self.seed, acyclic=topology == 'acyclic')
+                results[key] = self.run_fleet(fleet)
+        return {
+            'createdAt': datetime.utcnow().isoformat() + 'Z',
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': self.seed,
+            'importSeconds': self.import_seconds,
+            'results': results
+        }
+
+    def run_fleet(self, fleet):
+        """Run the pipeline over one fleet, feeding the later stages the discovered servers"""
+        results = {}
+        limits = {stage: limit for stage, limit in self.stage_limits.items() if len(fleet) > limit}
+        if 'discovery' in limits:
+            print(f"  Skipped: fleet is larger than the {limits['discovery']}-server discovery limit")
+            return {stage: {'skipped': f"fleet larger than {limits['discovery']} servers"}
+                    for stage in self.stages}
+
+        # Discovery always runs, since the later stages consume its records
+        if 'discovery' in self.stages:
+            results['discovery'], servers = self.measure(self.run_discovery, fleet)
+            self.report('discovery', results['discovery'])
+        else:
+            _, servers = self.run_discovery(fleet)
+
+        for stage, run in (('cost', self.run_cost), ('roadmap', self.run_roadmap)):
+            if stage not in self.stages:
+                continue
+            if stage in limits:
+                print(f"  {stage}: skipped, fleet is larger than its {limits[stage]}-server limit")
+                results[stage] = {'skipped': f"fleet larger than {limits[stage]} servers"}
+                continue
+            results[stage], _ = self.measure(run, servers)
+            self.report(stage, results[stage])
+        return results
+
+    def report(self, stage, result):
+        peak = f"peak {result['peakMemoryMb']:.1f} MB, " if result['peakMemoryMb'] is not None else ''
+        print(f"  {stage}: {result['wallSeconds']:.2f}s, {peak}{result['outputBytes'] / 1e6:.1f} MB output")
+
+    def measure(self, run, payload):
+        """Time a stage, then repeat it under tracemalloc for its peak memory"""
+        result, output = run(payload)
+        if self.measure_memory:
+            tracemalloc.start()
+            try:
+                result['peakMemoryMb'] = run(payload)[0]['peakMemoryMb']
+            finally:
+                tracemalloc.stop()
+        return result, output
+
+    def traced_peak(self):
+        """Get the peak traced memory in MB so far, read before the harness parses any output"""
+        if not tracemalloc.is_tracing():
+            return None
+        return round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+
+    def run_discovery(self, fleet):
+        """Run a full-fleet collection through the discovery handler, returning the discovered servers"""
+        module = self.handlers['discovery']
+        discovery = FakeDiscoveryClient(fleet, measure_payloads=True)
+        s3 = FakeS3Client()
+        dynamodb = FakeDynamoDBResource()
+
+        # Seed the handler's warm-container client cache, and start from a cold processor
+        pool_size = max(10, DISCOVERY_CONCURRENCY)
+        module._clients.clear()
+        module._clients.update({
+            ('client', 'discovery', pool_size): discovery,
+            ('client', 's3', pool_size): s3,
+            ('resource', 'dynamodb'): dynamodb
+        })
+        module._processor = None
+
+        event = {'body': json.dumps({'batchMode': True, 'concurrency': DISCOVERY_CONCURRENCY})}
+        start = time.perf_counter()
+        response = module.lambda_handler(event, None)
+        elapsed = time.perf_counter() - start
+        peak = self.traced_peak()
+
+        # Release the processor's fleet state before the records are read back
+        module._processor = None
+        module._clients.clear()
+
+        # The handler archives the records to S3 and returns a pointer to the run manifest
+        s3_stats = s3.counter.snapshot()
+        body = response.pop('body')
+        servers = []
+        manifest = json.loads(body).get('manifest')
+        if response['statusCode'] == 200 and manifest:
+            servers = [migration_server(record) for record in iter_archived_records(s3, manifest)]
+        s3.close()
+        discovery_stats = discovery.stats()
+        return {
+            'wallSeconds': round(elapsed, 4),
+            'peakMemoryMb': peak,
+            'statusCode': response['statusCode'],
+            'records': len(servers),
+            'inputBytes': len(event['body']),
+            'outputBytes': len(body),
+            'calls': {
+                'discovery': discovery_stats['calls'],
+                's3': s3_stats['calls'],
+                'dynamodb': dynamodb.counter.snapshot()['calls']
+            },
+            'clientBytes': {
+                'discovery': discovery_stats['payloadBytes'],
+                's3': s3_stats['bytes']
+            }
+        }, servers
+
+    def run_cost(self, servers):
+        """Estimate every server's costs through the cost handler, invoked as the frontend does"""
+        lambda_client = FakeLambdaClient({
+            os.environ['COST_ESTIMATOR_FUNCTION']: self.handlers['cost'].lambda_handler
+        })
+        statuses = Counter()
+        output_bytes = 0
+        start = time.perf_counter()
+        for server in servers:
+            # The cost estimator takes application names rather than application records
+            server_data = dict(server, applications=[app.get('name', '') for app in server['applications']])
+            response = lambda_client.invoke(
+                FunctionName=os.environ['COST_ESTIMATOR_FUNCTION'],
+                InvocationType='RequestResponse',
+                Payload=json.dumps({'body': json.dumps({'serverData': server_data})})
+            )
+            result = json.loads(response['Payload'].read())
+            statuses[result['statusCode']] += 1
+            output_bytes += len(result['body'])
+        elapsed = time.perf_counter() - start
+
+        return {
+            'wallSeconds': round(elapsed, 4),
+            'peakMemoryMb': self.traced_peak(),
+            'statusCode': max(statuses) if statuses else None,
+            'records': len(servers),
+            'statusCodes': {str(code): count for code, count in statuses.items()},
+            'inputBytes': lambda_client.counter.snapshot()['bytes'].get('invoke', 0),
+            'outputBytes': output_bytes,
+            'calls': {'lambda': lambda_client.counter.snapshot()['calls']}
+        }, None
+
+    def run_roadmap(self, servers):
+        """Generate a roadmap for the whole fleet, with cost estimates served in-process"""
+        module = self.handlers['roadmap']
+        lambda_client = FakeLambdaClient({
+            os.environ['COST_ESTIMATOR_FUNCTION']: self.handlers['cost'].lambda_handler
+        })
+        event = {'body': json.dumps({'servers': servers, 'startDate': ROADMAP_START_DATE})}
+
+        with mock.patch.object(module.EnhancedRoadmapGenerator, 'lambda_client', lambda_client):
+            start = time.perf_counter()
+            response = module.lambda_handler(event, None)
+            elapsed = time.perf_counter() - start
+            peak = self.traced_peak()
+
+        return {
+            'wallSeconds': round(elapsed, 4),
+            'peakMemoryMb': peak,
+            'statusCode': response['statusCode'],
+            'records': len(servers),
+            'inputBytes': len(event['body']),
+            'outputBytes': len(response['body']),
+            'calls': {'lambda': lambda_client.counter.snapshot()['calls']}
+        }, None
+
+def compare_results(baseline, current, tolerance=DEFAULT_TOLERANCE):
+    """Compare a run against a baseline, returning (regressions, improvements) as messages"""
+    regressions = []
+    improvements = []
+
+    def check(label, before, after, exact=False, floor=0):
+        if before is None or after is None or abs(after - before) <= floor:
+            return
+        if exact:
+            regressions.append(f"{label}: {before} -> {after}")
+            return
+        if before == 0:
+            regressions.append(f"{label}: {before} -> {after}")
+            return
+        change = (after - before) / before
+        message = f"{label}: {before} -> {after} ({change:+.0%})"
+        if change > tolerance:
+            regressions.append(message)
+        elif change < -tolerance:
+            improvements.append(message)
+
+    for size, stages in baseline.get('results', {}).items():
+        for stage, before in stages.items():
+            after = current.get('results', {}).get(size, {}).get(stage)
+            if after is None or 'skipped' in before or 'skipped' in after:
+                continue
+            prefix = f"{size} servers, {stage}"
+            for metric in EXACT_METRICS:
+                check(f"{prefix}, {metric}", before.get(metric), after.get(metric), exact=True)
+            for metric, floor in NOISE_FLOORS.items():
+                check(f"{prefix}, {metric}", before.get(metric), after.get(metric), floor=floor)
+
+            # Call counts are deterministic for a seeded fleet, so any growth is a regression
+            for client, calls in before.get('calls', {}).items():
+                after_calls = after.get('calls', {}).get(client, {})
+                for operation in set(calls) | set(after_calls):
+                    before_count = calls.get(operation, 0)
+                    after_count = after_calls.get(operation, 0)
+                    label = f"{prefix}, {client}.{operation} calls: {before_count} -> {after_count}"
+                    if after_count > before_count:
+                        regressions.append(label)
+                    elif after_count < before_count:
+                        improvements.append(label)
+
+    return regressions, improvements
+
+def parse_stage_limits(values):
+    """Parse stage=servers limits given on the command line"""
+    limits = {}
+    for value in values or []:
+        stage, _, servers = value.partition('=')
+        if stage not in STAGES or not servers.isdigit():
+            raise argparse.ArgumentTypeError(f"Invalid stage limit: {value}")
+        limits[stage] = int(servers)
+    return limits
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Lambda handlers against synthetic fleets')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Fleet sizes to run')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES, help='Stages to measure')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed of the synthetic fleets')
+    parser.add_argument('--topology', nargs='+', choices=TOPOLOGIES, default=TOPOLOGIES[:1],
+                        help='Dependency graph topologies of the synthetic fleets (default cyclic)')
+    parser.add_argument('--limit', action='append', metavar='STAGE=SERVERS',
+                        help='Skip a stage for fleets larger than this (default roadmap=%d)'
+                             % DEFAULT_STAGE_LIMITS['roadmap'])
+    parser.add_argument('--no-memory', action='store_true', help='Skip the tracemalloc pass')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help=f'Write the results to {BASELINE_PATH}')
+    parser.add_argument('--compare', nargs='?', const=BASELINE_PATH, metavar='BASELINE',
+                        help=f'Compare the results against a baseline (default {BASELINE_PATH})')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Relative change in time, memory or output size tolerated by --compare')
+    args = parser.parse_args()
+
+    benchmark = LambdaBenchmark(
+        sizes=args.sizes,
+        stages=args.stages,
+        seed=args.seed,
+        topologies=args.topology,
+        measure_memory=not args.no_memory,
+        stage_limits=parse_stage_limits(args.limit)
+    )
+    results = benchmark.run()
+
+    paths = [args.output] if args.output else []
+    if args.save_baseline:
+        paths.append(BASELINE_PATH)
+    for path in paths:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Results written to {path}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions, improvements = compare_results(baseline, results, args.tolerance)
+        for message in improvements:
+            print(f"Improved: {message}")
+        for message in regressions:
+            print(f"Regressed: {message}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
+
+if __name__ == "__main__":
+    main()
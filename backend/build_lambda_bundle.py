@@ -0,0 +1,212 @@
+import argparse
+import compileall
+import json
+import os
+import shutil
+import subprocess
+import sys
+import zipfile
+
+# Vendored dependencies for the discovery Lambda, relative to the backend directory
+VENDOR_DIR = '../lambda/discoveryProcessor'
+HANDLER_DIR = 'lambda/discoveryProcessor'
+BUILD_DIR = 'build/discoveryProcessor'
+
+# Lambda runtime the bundle targets (see InfrastructureManager.create_lambda_functions)
+TARGET_RUNTIME = (3, 9)
+
+# AWS services the handlers create clients or resources for
+KEEP_SERVICES = {'discovery', 's3', 'dynamodb', 'lambda'}
+
+# Model files only used to render documentation
+DOC_ONLY_MODELS = {'examples-1.json'}
+
+# Directory names stripped wherever they appear in the bundle
+STRIP_DIRS = {'tests', '__pycache__'}
+
+# Paths stripped relative to the bundle root
+STRIP_PATHS = ['share/doc', 'bin']
+
+# Measures the cold-start cost of importing boto3 and creating every client the handlers use
+COLD_START_PROBE = """
+import sys, time
+sys.path.insert(0, {path!r})
+start = time.perf_counter()
+import boto3
+boto3.client('discovery', region_name='us-east-1')
+boto3.client('s3', region_name='us-east-1')
+boto3.client('lambda', region_name='us-east-1')
+boto3.resource('dynamodb', region_name='us-east-1')
+print(time.perf_counter() - start)
+"""
+
+class LambdaBundleBuilder:
+    def __init__(self, vendor_dir=VENDOR_DIR, handler_dir=HANDLER_DIR, build_dir=BUILD_DIR):
+        self.vendor_dir = vendor_dir
+        self.handler_dir = handler_dir
+        self.build_dir = build_dir
+
+    def build(self):
+        """Build the trimmed discovery Lambda bundle"""
+        self.check_vendor_tree()
+        print(f"Building Lambda bundle in {self.build_dir}...")
+        if os.path.exists(self.build_dir):
+            shutil.rmtree(self.build_dir)
+        shutil.copytree(self.vendor_dir, self.build_dir, ignore=shutil.ignore_patterns(*STRIP_DIRS))
+
+        for path in STRIP_PATHS:
+            shutil.rmtree(os.path.join(self.build_dir, path), ignore_errors=True)
+
+        self.trim_service_models(os.path.join(self.build_dir, 'botocore', 'data'))
+        self.trim_resource_models(os.path.join(self.build_dir, 'boto3', 'data'))
+
+        # The handler and any data files it ships with sit at the bundle root
+        for name in os.listdir(self.handler_dir):
+            source = os.path.join(self.handler_dir, name)
+            if os.path.isfile(source):
+                shutil.copy2(source, os.path.join(self.build_dir, name))
+
+        self.precompile()
+        print("Bundle build complete")
+
+    def check_vendor_tree(self):
+        """Refuse to bundle vendored files that differ from the committed ones, such as a local CA bundle"""
+        try:
+            result = subprocess.run(
+                ['git', 'status', '--porcelain', '--', self.vendor_dir],
+                capture_output=True, text=True
+            )
+        except OSError:
+            print("Skipping vendored tree check: git is not available")
+            return
+        if result.returncode != 0:
+            print(f"Skipping vendored tree check: {result.stderr.strip()}")
+            return
+        if result.stdout.strip():
+            raise RuntimeError(
+                f"Vendored files in {self.vendor_dir} have uncommitted changes; "
+                f"revert them before building:\n{result.stdout.rstrip()}"
+            )
+
+    def trim_service_models(self, data_dir):
+        """Keep the latest API version of the needed botocore models, minified"""
+        for service in os.listdir(data_dir):
+            service_dir = os.path.join(data_dir, service)
+            if not os.path.isdir(service_dir):
+                continue
+            if service not in KEEP_SERVICES:
+                shutil.rmtree(service_dir)
+                continue
+
+            # botocore always loads the newest API version
+            versions = sorted(os.listdir(service_dir))
+            for version in versions[:-1]:
+                shutil.rmtree(os.path.join(service_dir, version))
+
+            version_dir = os.path.join(service_dir, versions[-1])
+            for name in os.listdir(version_dir):
+                path = os.path.join(version_dir, name)
+                if name in DOC_ONLY_MODELS:
+                    os.remove(path)
+                elif name.endswith('.json'):
+                    self.minify_json(path)
+
+        for name in os.listdir(data_dir):
+            if name.endswith('.json'):
+                self.minify_json(os.path.join(data_dir, name))
+
+    def trim_resource_models(self, data_dir):
+        """Keep only the boto3 resource models for services the handlers use"""
+        for service in os.listdir(data_dir):
+            service_dir = os.path.join(data_dir, service)
+            if service not in KEEP_SERVICES:
+                shutil.rmtree(service_dir)
+                continue
+            for root, _, files in os.walk(service_dir):
+                for name in files:
+                    if name.endswith('.json'):
+                        self.minify_json(os.path.join(root, name))
+
+    def minify_json(self, path):
+        """Rewrite a JSON model without whitespace to shrink the bundle"""
+        with open(path, 'r') as f:
+            model = json.load(f)
+        with open(path, 'w') as f:
+            json.dump(model, f, separators=(',', ':'))
+
+    def precompile(self):
+        """Precompile bytecode, since /var/task is read-only and Lambda can't cache it"""
+        if sys.version_info[:2] != TARGET_RUNTIME:
+            print(f"Skipping bytecode precompilation: building with Python "
+                  f"{sys.version_info[0]}.{sys.version_info[1]}, runtime is "
+                  f"{TARGET_RUNTIME[0]}.{TARGET_RUNTIME[1]}")
+            return
+        compileall.compile_dir(self.build_dir, quiet=1)
+
+    def package(self, zip_path):
+        """Zip the bundle for deployment"""
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            for root, _, files in os.walk(self.build_dir):
+                for name in files:
+                    path = os.path.join(root, name)
+                    zipf.write(path, os.path.relpath(path, self.build_dir))
+        print(f"Bundle packaged at {zip_path} ({os.path.getsize(zip_path) / 1e6:.1f} MB)")
+
+    def directory_size(self, path):
+        """Get the unzipped size of a directory tree in bytes"""
+        total = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                total += os.path.getsize(os.path.join(root, name))
+        return total
+
+    def measure_cold_start(self, path, runs=10):
+        """Get the best-of-N time to import boto3 and create the handlers' clients"""
+        env = dict(os.environ)
+        env.setdefault('AWS_ACCESS_KEY_ID', 'bundle-probe')
+        env.setdefault('AWS_SECRET_ACCESS_KEY', 'bundle-probe')
+        timings = []
+        for _ in range(runs):
+            result = subprocess.run(
+                [sys.executable, '-s', '-c', COLD_START_PROBE.format(path=os.path.abspath(path))],
+                capture_output=True, text=True, env=env
+            )
+            if result.returncode != 0:
+                print(f"Error measuring cold start for {path}: {result.stderr.strip()}")
+                return None
+            timings.append(float(result.stdout.strip()))
+        return min(timings)
+
+    def report(self):
+        """Compare unzipped size and cold-start time of the vendored and trimmed bundles"""
+        before = {
+            'size_mb': (self.directory_size(self.vendor_dir) + self.directory_size(self.handler_dir)) / 1e6,
+            'cold_start_s': self.measure_cold_start(self.vendor_dir)
+        }
+        after = {
+            'size_mb': self.directory_size(self.build_dir) / 1e6,
+            'cold_start_s': self.measure_cold_start(self.build_dir)
+        }
+
+        print("\nBundle report:")
+        print(f"  Unzipped size: {before['size_mb']:.1f} MB -> {after['size_mb']:.1f} MB")
+        if before['cold_start_s'] is not None and after['cold_start_s'] is not None:
+            print(f"  Cold-start imports + clients: {before['cold_start_s'] * 1000:.0f} ms -> "
+                  f"{after['cold_start_s'] * 1000:.0f} ms")
+        return {'before': before, 'after': after}
+
+def main():
+    parser = argparse.ArgumentParser(description='Build a trimmed discovery Lambda bundle')
+    parser.add_argument('--zip', help='Also write a deployment zip to this path')
+    parser.add_argument('--no-report', action='store_true', help='Skip the size and cold-start report')
+    args = parser.parse_args()
+
+    builder = LambdaBundleBuilder()
+    builder.build()
+    if args.zip:
+        builder.package(args.zip)
+    if not args.no_report:
+        builder.report()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+import argparse
+import json
+import random
+import threading
+import time
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta
+
+import networkx
+from botocore.exceptions import ClientError
+
+# Operating systems assigned to synthetic servers, with relative weights
+OPERATING_SYSTEMS = [
+    (('Ubuntu', '16.04'), 2), (('Ubuntu', '18.04'), 4), (('Ubuntu', '20.04'), 8),
+    (('Ubuntu', '22.04'), 10), (('Ubuntu', '24.04'), 4),
+    (('Red Hat Enterprise Linux', '7.9'), 4), (('Red Hat Enterprise Linux', '8.6'), 6),
+    (('Red Hat Enterprise Linux', '9.2'), 4), (('CentOS Linux', '7.9.2009'), 3),
+    (('Amazon Linux', '2'), 5), (('Amazon Linux', '2023'), 3),
+    (('Debian GNU/Linux', '11'), 3), (('Debian GNU/Linux', '12'), 2),
+    (('Microsoft Windows Server 2016 Standard', '10.0.14393'), 3),
+    (('Microsoft Windows Server 2019 Datacenter', '10.0.17763'), 4),
+    (('Microsoft Windows Server 2022 Datacenter', '10.0.20348'), 2)
+]
+
+# Installable applications and the versions seen in the fleet, including known-vulnerable ones
+APPLICATIONS = {
+    'Apache': ['2.4.49', '2.4.50', '2.4.57', '2.4.62'],
+    'nginx': ['1.18.0', '1.20.0', '1.24.0', '1.26.1'],
+    'OpenSSL': ['1.0.1f', '1.1.1w', '3.0.13'],
+    'OpenSSH': ['7.4p1', '8.2p1', '9.6p1', '9.8p1'],
+    'Tomcat': ['8.5.50', '9.0.30', '9.0.85'],
+    'log4j': ['2.14.1', '2.17.2'],
+    'Spring Framework': ['5.2.19', '5.3.17', '5.3.31'],
+    'MySQL': ['5.7.44', '8.0.36'],
+    'PostgreSQL': ['12.18', '15.6'],
+    'Redis': ['6.2.14', '7.2.4'],
+    'Node.js': ['16.20.2', '18.19.0', '20.11.1'],
+    'Python': ['3.8.10', '3.11.8']
+}
+
+DEPENDENCY_TYPES = ['api', 'database', 'cache', 'queue', 'storage']
+COMMON_PORTS = [22, 80, 443, 3306, 5432, 6379, 8080, 8443]
+INSECURE_PORTS = [21, 23, 445, 3389]
+
+# Maximum serverIds per call and page size of describe_servers, as in the real service
+BATCH_LIMIT = 100
+MAX_PAGE_SIZE = 100
+
+class SyntheticFleet:
+    """Seeded synthetic server fleet with a scale-free dependency graph"""
+
+    def __init__(self, size, seed=42, metric_history=24, traffic_days=7, base_time=None, acyclic=False):
+        self.size = size
+        self.seed = seed
+        self.metric_history = metric_history
+        self.traffic_days = traffic_days
+        self.base_time = base_time or datetime(2026, 1, 5)
+        self.server_ids = [f"d-server-{index:07d}" for index in range(size)]
+        self.index = {server_id: index for index, server_id in enumerate(self.server_ids)}
+        self.updated = {}
+
+        # Heavy-tailed in-degree: a few hub services that many servers depend on. The raw graph has a
+        # strongly connected core reaching a fixed share of the fleet, like the mutual dependencies of
+        # real fleets; acyclic fleets keep only edges from newer to older servers, giving a tiered layout
+        graph = networkx.scale_free_graph(size, seed=seed)
+        successors = [set() for _ in range(size)]
+        for source, target in graph.edges():
+            if source > target or (source < target and not acyclic):
+                successors[source].add(target)
+        self.successors = [array('i', sorted(targets)) for targets in successors]
+
+        os_choices, os_weights = zip(*OPERATING_SYSTEMS)
+        rng = random.Random(seed)
+        self.operating_systems = [rng.choices(os_choices, os_weights)[0] for _ in range(size)]
+
+    def __len__(self):
+        return self.size
+
+    def rng(self, index, salt):
+        """Get the deterministic random generator of one aspect of a server"""
+        return random.Random(f"{self.seed}:{index}:{salt}")
+
+    def touch(self, server_ids, when=None):
+        """Mark servers as updated by their agents, for incremental collection runs"""
+        when = when or datetime.utcnow()
+        for server_id in server_ids:
+            self.updated[server_id] = when
+
+    def private_ip(self, index):
+        """Get the private address of a server's first interface"""
+        return f"10.{(index >> 16) & 255}.{(index >> 8) & 255}.{index & 255}"
+
+    def server(self, index):
+        """Get the inventory entry of a server"""
+        os_name, os_version = self.operating_systems[index]
+        server_id = self.server_ids[index]
+        updated = self.updated.get(server_id, self.base_time - timedelta(minutes=index % 1440))
+        return {
+            'serverId': server_id,
+            'serverName': f"synthetic-{index}",
+            'serverType': 'Windows' if 'Windows' in os_name else 'Linux',
+            'osName': os_name,
+            'osVersion': os_version,
+            'agentLastUpdated': updated.isoformat() + 'Z'
+        }
+
+    def server_information(self, index):
+        """Get the hardware details of a server"""
+        rng = self.rng(index, 'info')
+        cores = rng.choice([2, 4, 8, 16, 32])
+        return {
+            'serverId': self.server_ids[index],
+            'serverModel': rng.choice(['Intel Xeon Gold 6248', 'AMD EPYC 7R13', 'Intel Xeon E5-2686']),
+            'systemArchitecture': 'x86_64',
+            'numCores': cores,
+            'numSockets': 1 if cores <= 8 else 2,
+            'ramBytes': cores * 4 * 1024 ** 3,
+            'diskBytes': rng.choice([100, 250, 500, 1000]) * 1024 ** 3,
+            'lastPatchedDate': (self.base_time - timedelta(days=rng.randrange(400))).isoformat() + 'Z'
+        }
+
+    def utilization_metrics(self, index):
+        """Get the utilization metrics and histories of a server"""
+        rng = self.rng(index, 'metrics')
+        info = self.server_information(index)
+        metrics = {'serverId': self.server_ids[index], 'numCores': info['numCores']}
+        for key in ('cpu', 'memory', 'storage', 'network'):
+            level = rng.uniform(5, 85)
+            drift = rng.uniform(-0.5, 1.0)
+            history = [
+                round(min(100.0, max(0.0, level + drift * step + rng.gauss(0, 5))), 2)
+                for step in range(self.metric_history)
+            ]
+            metrics[f'{key}Utilization'] = history[-1] if history else round(level, 2)
+            metrics[f'{key}UtilizationHistory'] = history
+        metrics['ramBytes'] = info['ramBytes']
+        metrics['ramBytesUsed'] = int(info['ramBytes'] * metrics['memoryUtilization'] / 100)
+        metrics['ramUtilization'] = metrics['memoryUtilization']
+        metrics['diskBytes'] = info['diskBytes']
+        metrics['diskBytesUsed'] = int(info['diskBytes'] * metrics['storageUtilization'] / 100)
+        metrics['diskUtilization'] = metrics['storageUtilization']
+        metrics['networkBytesIn'] = rng.randrange(10 ** 6, 10 ** 10)
+        metrics['networkBytesOut'] = rng.randrange(10 ** 6, 10 ** 10)
+        return metrics
+
+    def applications(self, index):
+        """Get the applications installed on a server"""
+        rng = self.rng(index, 'apps')
+        names = rng.sample(sorted(APPLICATIONS), rng.randint(3, 8))
+        return [{
+            'serverId': self.server_ids[index],
+            'name': name,
+            'version': rng.choice(APPLICATIONS[name]),
+            'path': f"/opt/{name.lower().replace(' ', '-')}",
+            'type': 'service',
+            'status': 'running'
+        } for name in names]
+
+    def dependencies(self, index):
+        """Get the outbound dependencies of a server"""
+        rng = self.rng(index, 'deps')
+        return [{
+            'sourceServerId': self.server_ids[index],
+            'destinationServerId': self.server_ids[target],
+            'dependencyType': rng.choice(DEPENDENCY_TYPES),
+            'destinationPort': rng.choice(COMMON_PORTS),
+            'averageLatency': round(rng.uniform(0.5, 50), 2),
+            'averageThroughput': round(rng.uniform(1, 500), 2),
+            'frequency': rng.randrange(1, 1000),
+            'errorRate': round(rng.uniform(0, 2), 3)
+        } for target in self.successors[index]]
+
+    def network_info(self, index):
+        """Get the network interfaces of a server, with throughput histories and connections"""
+        rng = self.rng(index, 'network')
+        subnet = f"10.{(index >> 16) & 255}.{(index >> 8) & 255}.0/24"
+        connections = [{'remoteAddress': self.private_ip(target), 'remotePort': rng.choice(COMMON_PORTS)}
+                       for target in self.successors[index]]
+        connections += [{'remoteAddress': f"52.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}",
+                         'remotePort': 443} for _ in range(rng.randrange(3))]
+
+        ports = rng.sample(COMMON_PORTS, rng.randint(1, 4))
+        if rng.random() < 0.1:
+            ports.append(rng.choice(INSECURE_PORTS))
+
+        maximum = rng.choice([1000, 10000])
+        peak_hour = rng.randrange(8, 20)
+        history = []
+        for hour in range(self.traffic_days * 24):
+            timestamp = self.base_time - timedelta(hours=self.traffic_days * 24 - hour)
+            busy = 3.0 if timestamp.weekday() < 5 and abs(timestamp.hour - peak_hour) <= 1 else 1.0
+            value = maximum * 0.05 * busy * rng.uniform(0.8, 1.2)
+            if rng.random() < 0.002:
+                value *= 8
+            history.append({'timestamp': timestamp.isoformat() + 'Z', 'throughput': round(value, 2)})
+
+        return [{
+            'serverId': self.server_ids[index],
+            'networkInterfaceId': f"eni-{index:08x}",
+            'interfaceType': 'ethernet',
+            'privateIpAddress': self.private_ip(index),
+            'publicIpAddress': (f"54.{(index >> 16) & 255}.{(index >> 8) & 255}.{index & 255}"
+                                if rng.random() < 0.1 else ''),
+            'ipAliases': [],
+            'subnetId': f"subnet-{(index >> 8) & 0xffff:04x}",
+            'subnetCidr': subnet,
+            'currentThroughput': history[-1]['throughput'] if history else 0,
+            'maximumThroughput': maximum,
+            'securityGroups': [f"sg-{rng.randrange(16):02x}"],
+            'openPorts': ports,
+            'status': 'up',
+            'throughputHistory': history,
+            'connections': connections
+        }]
+
+class FakeDiscoveryClient:
+    """Local stand-in for the Application Discovery client, backed by a synthetic fleet"""
+
+    def __init__(self, fleet, latency=0.0, latency_jitter=0.0, throttle_rate=0.0,
+                 max_in_flight=None, measure_payloads=False, seed=0):
+        self.fleet = fleet
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.throttle_rate = throttle_rate
+        self.max_in_flight = max_in_flight
+        self.measure_payloads = measure_payloads
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset per-method call, throttle, item and payload counters"""
+        with self.lock:
+            self.calls = Counter()
+            self.throttled = Counter()
+            self.items = Counter()
+            self.payload_bytes = Counter()
+
+    def stats(self):
+        """Get a snapshot of the counters"""
+        with self.lock:
+            return {
+                'calls': dict(self.calls),
+                'throttled': dict(self.throttled),
+                'items': dict(self.items),
+                'payloadBytes': dict(self.payload_bytes)
+            }
+
+    def describe_servers(self, serverIds=None, maxResults=MAX_PAGE_SIZE, nextToken=None):
+        """Page through the inventory, or describe specific servers"""
+        def build():
+            if serverIds:
+                indexes = self._indexes('describe_servers', serverIds)
+                return {'servers': [self.fleet.server(index) for index in indexes]}
+
+            start = int(nextToken or 0)
+            end = min(start + min(maxResults, MAX_PAGE_SIZE), len(self.fleet))
+            response = {'servers': [self.fleet.server(index) for index in range(start, end)]}
+            if end < len(self.fleet):
+                response['nextToken'] = str(end)
+            return response
+        return self._call('describe_servers', 'servers', build)
+
+    def describe_server_information(self, serverIds):
+        return self._batched('describe_server_information', 'serverInfo', serverIds,
+                             self.fleet.server_information)
+
+    def get_server_utilization_metrics(self, serverIds):
+        return self._batched('get_server_utilization_metrics', 'utilizationMetrics', serverIds,
+                             self.fleet.utilization_metrics)
+
+    def list_server_applications(self, serverIds):
+        return self._batched('list_server_applications', 'applications', serverIds,
+                             self.fleet.applications)
+
+    def describe_server_dependencies(self, serverIds):
+        return self._batched('describe_server_dependencies', 'dependencies', serverIds,
+                             self.fleet.dependencies)
+
+    def describe_server_network_info(self, serverIds):
+        return self._batched('describe_server_network_info', 'networkInfo', serverIds,
+                             self.fleet.network_info)
+
+    def _batched(self, operation, result_key, server_ids, generate):
+        """Serve a batched per-server call, flattening every server's items"""
+        def build():
+            items = []
+            for index in self._indexes(operation, server_ids):
+                generated = generate(index)
+                items.extend(generated if isinstance(generated, list) else [generated])
+            return {result_key: items}
+        return self._call(operation, result_key, build)
+
+    def _indexes(self, operation, server_ids):
+        """Validate a serverIds argument and map it to fleet indexes"""
+        if len(server_ids) > BATCH_LIMIT:
+            raise self._error(operation, 'InvalidParameterValueException',
+                              f"At most {BATCH_LIMIT} serverIds are allowed")
+        return [self.fleet.index[server_id] for server_id in server_ids if server_id in self.fleet.index]
+
+    def _call(self, operation, result_key, build):
+        """Apply injected throttling and latency around a call, then count it"""
+        with self.lock:
+            self.calls[operation] += 1
+            throttled = (self.throttle_rate and self.random.random() < self.throttle_rate) or (
+                self.max_in_flight is not None and self.in_flight >= self.max_in_flight)
+            if throttled:
+                self.throttled[operation] += 1
+            else:
+                self.in_flight += 1
+            delay = self.latency * (1 + self.random.uniform(-self.latency_jitter, self.latency_jitter))
+        if throttled:
+            raise self._error(operation, 'ThrottlingException', 'Rate exceeded')
+
+        try:
+            if delay > 0:
+                time.sleep(delay)
+            response = build()
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+        size = len(json.dumps(response)) if self.measure_payloads else 0
+        with self.lock:
+            self.items[operation] += len(response[result_key])
+            self.payload_bytes[operation] += size
+        return response
+
+    def _error(self, operation, code, message):
+        """Build the botocore error the real client would raise"""
+        return ClientError({'Error': {'Code': code, 'Message': message}}, operation)
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic discovery fleet')
+    parser.add_argument('--servers', type=int, default=1000, help='Number of servers in the fleet')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed of the fleet')
+    parser.add_argument('--sample', type=int, default=1, help='Number of sample servers to print')
+    parser.add_argument('--acyclic', action='store_true', help='Drop dependency edges that form cycles')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    fleet = SyntheticFleet(args.servers, seed=args.seed, acyclic=args.acyclic)
+    edges = sum(len(targets) for targets in fleet.successors)
+    in_degree = Counter(target for targets in fleet.successors for target in targets)
+    print(f"Generated {len(fleet)} servers and {edges} dependencies in {time.perf_counter() - start:.1f}s")
+    print(f"Largest hub has {max(in_degree.values(), default=0)} dependents")
+
+    client = FakeDiscoveryClient(fleet)
+    for server_id in fleet.server_ids[:args.sample]:
+        server = client.describe_servers(serverIds=[server_id])['servers'][0]
+        print(json.dumps(server, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -151,8 +151,21 @@ class InfrastructureManager:
             try:
                 # Create ZIP file
                 zip_path = f"/tmp/{function_name}.zip"
+                bundle_dir = f"build/{func_key}"
                 with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    zipf.write(handler_file, "index.py")
+                    if os.path.isdir(bundle_dir):
+                        # Trimmed bundle produced by build_lambda_bundle.py
+                        print(f"Packaging {function_name} from bundle {bundle_dir}")
+                        for root, _, files in os.walk(bundle_dir):
+                            for name in files:
+                                path = os.path.join(root, name)
+                                zipf.write(path, os.path.relpath(path, bundle_dir))
+                    else:
+                        # The handler and any data files it ships with, such as the CVE feed
+                        for name in os.listdir(lambda_dir):
+                            path = os.path.join(lambda_dir, name)
+                            if os.path.isfile(path):
+                                zipf.write(path, name)
                 
                 with open(zip_path, 'rb') as f:
                     zip_content = f.read()
@@ -371,6 +384,12 @@ class InfrastructureManager:
             print("Waiting for DynamoDB table to be ready...")
             waiter = self.dynamodb.get_waiter('table_exists')
             waiter.wait(TableName=table_name)
+
+            # Expired discovery result cache items are purged by DynamoDB
+            self.dynamodb.update_time_to_live(
+                TableName=table_name,
+                TimeToLiveSpecification={'Enabled': True, 'AttributeName': 'expiresAt'}
+            )
             
             return table_name
 
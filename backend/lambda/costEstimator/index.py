@@ -1,5 +1,4 @@
 import json
-import boto3
 import os
 from datetime import datetime
 from decimal import Decimal
@@ -1,71 +1,2277 @@
-import boto3
+import time
+
+_MODULE_IMPORT_START = time.perf_counter()
+
+import gzip
+import hashlib
+import importlib.util
+import ipaddress
 import json
+import math
+import multiprocessing
+import operator
 import os
-from datetime import datetime, timedelta
-from typing import Dict, List, Set
+import queue
+import random
+import re
+import socket
+import threading
+import types
+import uuid
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List
+
+# Import profiling: IMPORT_PROFILE=true logs per-module import cost, and
+# IMPORT_BUDGET_MS warns when total import time exceeds the cold-start budget
+IMPORT_PROFILE = os.environ.get('IMPORT_PROFILE', 'false').lower() == 'true'
+IMPORT_BUDGET_MS = float(os.environ.get('IMPORT_BUDGET_MS', '0'))
+IMPORT_TIMINGS = {}
+
+def record_import_time(module_name: str, seconds: float):
+    """Record a module's import cost and check it against the cold-start budget"""
+    IMPORT_TIMINGS[module_name] = round(seconds * 1000, 2)
+    if IMPORT_PROFILE:
+        print(f"Imported {module_name} in {IMPORT_TIMINGS[module_name]} ms")
+
+    total = sum(IMPORT_TIMINGS.values())
+    if IMPORT_BUDGET_MS and total > IMPORT_BUDGET_MS:
+        print(f"Import budget exceeded: {total:.1f} ms > {IMPORT_BUDGET_MS:.1f} ms "
+              f"(after {module_name})")
+
+class LazyModule(types.ModuleType):
+    """Module proxy that imports the real module on first attribute access"""
+
+    def __init__(self, module_name: str):
+        super().__init__(module_name)
+        self._module = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def load(self) -> types.ModuleType:
+        """Import the wrapped module if it hasn't been imported yet"""
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self.__name__)
+                    record_import_time(self.__name__, time.perf_counter() - start)
+                    self._module = module
+        return self._module
+
+    def is_available(self) -> bool:
+        """Check whether the module can be imported, without importing it"""
+        return self._module is not None or importlib.util.find_spec(self.__name__) is not None
+
+# Heavy vendored dependencies are only imported by the code paths that need them
+boto3 = LazyModule('boto3')
+botocore_config = LazyModule('botocore.config')
+botocore_exceptions = LazyModule('botocore.exceptions')
+networkx = LazyModule('networkx')
+
+# Clients, resources and the processor are kept at module scope so warm containers reuse them
+_clients = {}
+_clients_lock = threading.Lock()
+_processor = None
+_processor_created = 0.0
+_vulnerability_indexes = {}
+_vulnerability_lock = threading.Lock()
+_compliance_rule_sets = {}
+_compliance_lock = threading.Lock()
+_os_lifecycle_catalogs = {}
+_os_lifecycle_lock = threading.Lock()
+
+# Per-service botocore retry overrides; discovery throttles and transient errors are retried by
+# AdaptiveThrottle instead, so botocore's retries don't multiply its attempts
+CLIENT_RETRIES = {
+    'discovery': {'total_max_attempts': 1}
+}
+
+def get_aws_client(service_name: str, max_pool_connections: int = 10):
+    """Get a boto3 client, created on first use and reused for the container's lifetime"""
+    key = ('client', service_name, max_pool_connections)
+    with _clients_lock:
+        if key not in _clients:
+            config = botocore_config.Config(max_pool_connections=max_pool_connections)
+            if service_name in CLIENT_RETRIES:
+                config = config.merge(botocore_config.Config(retries=CLIENT_RETRIES[service_name]))
+            _clients[key] = boto3.client(service_name, config=config)
+        return _clients[key]
+
+def get_aws_resource(service_name: str):
+    """Get a boto3 resource, created on first use and reused for the container's lifetime"""
+    key = ('resource', service_name)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = boto3.resource(service_name)
+        return _clients[key]
+
+def get_vulnerability_index() -> 'VulnerabilityIndex':
+    """Get the CVE index of the local feed snapshot, loaded once per container"""
+    path = os.environ.get(
+        'VULN_FEED_PATH',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vulnerability-feed.json')
+    )
+    with _vulnerability_lock:
+        if path not in _vulnerability_indexes:
+            _vulnerability_indexes[path] = VulnerabilityIndex.from_file(path)
+        return _vulnerability_indexes[path]
+
+def get_compliance_rules() -> 'ComplianceRuleSet':
+    """Get the compiled compliance rule set, loaded once per container"""
+    path = os.environ.get(
+        'COMPLIANCE_RULES_PATH',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'compliance-rules.json')
+    )
+    with _compliance_lock:
+        if path not in _compliance_rule_sets:
+            _compliance_rule_sets[path] = ComplianceRuleSet.from_file(path)
+        return _compliance_rule_sets[path]
+
+def get_os_lifecycle_catalog() -> 'OSLifecycleCatalog':
+    """Get the OS support lifecycle catalog, loaded once per container"""
+    path = os.environ.get(
+        'OS_LIFECYCLE_PATH',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'os-lifecycle.json')
+    )
+    with _os_lifecycle_lock:
+        if path not in _os_lifecycle_catalogs:
+            _os_lifecycle_catalogs[path] = OSLifecycleCatalog.from_file(path)
+        return _os_lifecycle_catalogs[path]
+
+class AdaptiveThrottle:
+    """Shared AIMD concurrency limit with jittered retries for throttled and transient API errors"""
+
+    THROTTLE_CODES = {
+        'ThrottlingException',
+        'Throttling',
+        'TooManyRequestsException',
+        'RequestLimitExceeded'
+    }
+
+    # Service error codes worth retrying without cutting the concurrency limit
+    TRANSIENT_CODES = {
+        'InternalError',
+        'InternalFailure',
+        'InternalServerError',
+        'ServiceUnavailable',
+        'ServiceUnavailableException',
+        'RequestTimeout',
+        'RequestTimeoutException'
+    }
+
+    def __init__(self, initial_limit: float = 4, min_limit: float = 1, max_limit: float = 32,
+                 increase: float = 1.0, decrease: float = 0.5, max_retries: int = 5,
+                 base_delay: float = 0.1, max_delay: float = 5.0):
+        """Initialize the throttle with its AIMD and retry parameters"""
+        self.min_limit = min_limit
+        self.max_limit = max(min_limit, max_limit)
+        self.limit = min(max(initial_limit, min_limit), self.max_limit)
+        self.increase = increase
+        self.decrease = decrease
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        self.condition = threading.Condition()
+        self.counters = {
+            'calls': 0,
+            'successes': 0,
+            'throttles': 0,
+            'retries': 0,
+            'transientErrors': 0,
+            'failures': 0
+        }
+
+    def call(self, func, *args, **kwargs):
+        """Invoke func within the concurrency limit, retrying throttled and transient failures"""
+        attempt = 0
+        while True:
+            self._acquire()
+            outcome = {}
+            try:
+                result = func(*args, **kwargs)
+                outcome['succeeded'] = True
+                return result
+            except Exception as e:
+                throttled = self.is_throttle_error(e)
+                outcome['throttled'] = throttled
+                retryable = throttled or self.is_transient_error(e)
+                if not retryable or attempt >= self.max_retries:
+                    self._count('failures')
+                    raise
+                if not throttled:
+                    self._count('transientErrors')
+            finally:
+                # The slot is released whatever was raised, so failures can't leak capacity
+                self._release(**outcome)
+
+            self._count('retries')
+            time.sleep(self.backoff_delay(attempt))
+            attempt += 1
+
+    def error_code(self, error: Exception) -> str:
+        """Get the service error code of an exception; HTTP-level botocore errors have no response"""
+        response = getattr(error, 'response', None) or {}
+        return (response.get('Error') or {}).get('Code', '')
+
+    def is_throttle_error(self, error: Exception) -> bool:
+        """Check whether an exception is a service throttling error"""
+        return self.error_code(error) in self.THROTTLE_CODES
+
+    def is_transient_error(self, error: Exception) -> bool:
+        """Check whether an exception is a timeout, dropped connection or 5xx worth retrying"""
+        if self.error_code(error) in self.TRANSIENT_CODES:
+            return True
+        response = getattr(error, 'response', None) or {}
+        if (response.get('ResponseMetadata') or {}).get('HTTPStatusCode', 0) >= 500:
+            return True
+        try:
+            return isinstance(error, (botocore_exceptions.HTTPClientError,
+                                      botocore_exceptions.ConnectionError))
+        except ImportError:
+            return False
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay for a retry attempt"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def reset_counters(self):
+        """Zero the call counters while keeping the learned limit"""
+        with self.condition:
+            for counter in self.counters:
+                self.counters[counter] = 0
+
+    def snapshot(self) -> dict:
+        """Get the current limit and call counters"""
+        with self.condition:
+            return dict(self.counters, limit=round(self.limit, 2), inFlight=self.in_flight)
+
+    def _acquire(self):
+        with self.condition:
+            while self.in_flight >= max(1, int(self.limit)):
+                self.condition.wait()
+            self.in_flight += 1
+            self.counters['calls'] += 1
+
+    def _release(self, succeeded: bool = False, throttled: bool = False):
+        with self.condition:
+            self.in_flight -= 1
+            if succeeded:
+                self.counters['successes'] += 1
+                # Additive increase: about one extra slot per limit's worth of successes
+                self.limit = min(self.max_limit, self.limit + self.increase / max(1.0, self.limit))
+            elif throttled:
+                self.counters['throttles'] += 1
+                # Calls already in flight when the limit was cut shouldn't cut it again
+                now = time.monotonic()
+                if now - self.last_decrease >= self.base_delay:
+                    self.limit = max(self.min_limit, self.limit * self.decrease)
+                    self.last_decrease = now
+            self.condition.notify_all()
+
+    def _count(self, counter: str):
+        with self.condition:
+            self.counters[counter] += 1
+
+class ThrottledClient:
+    """Client proxy that routes every API operation through an AdaptiveThrottle"""
+
+    PASSTHROUGH = {'can_paginate', 'get_paginator', 'get_waiter', 'close'}
+
+    def __init__(self, client, throttle: AdaptiveThrottle):
+        self._client = client
+        self.throttle = throttle
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith('_') or name in self.PASSTHROUGH or not callable(attr):
+            return attr
+
+        def throttled_call(*args, **kwargs):
+            return self.throttle.call(attr, *args, **kwargs)
+
+        return throttled_call
+
+class DependencyGraph:
+    """Compact dependency graph with interned server IDs and CSR adjacency arrays"""
+
+    def __init__(self):
+        """Initialize an empty graph"""
+        self.node_index = {}
+        self.node_ids = []
+        self.type_index = {}
+        self.type_names = []
+        self.reported = bytearray()
+        self.version = 0
+        self._analysis_cache = {}
+
+        # Edges are appended to a log and compacted into CSR arrays on demand
+        self._log = self._empty_edges()
+        self._compiled_version = 0
+
+        # Log position before which each replaced node's earlier edges are dropped
+        self._replaced_before = {}
+        self.offsets = array('l', [0])
+        self.targets = array('i')
+        self.types = array('H')
+        self.strengths = array('d')
+        self.latencies = array('d')
+        self.throughputs = array('d')
+
+    def __contains__(self, server_id: str) -> bool:
+        node = self.node_index.get(server_id)
+        return node is not None and bool(self.reported[node])
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        """Number of logged edges, including duplicates not yet compacted"""
+        return len(self._log[1])
+
+    def intern(self, server_id: str) -> int:
+        """Get the integer node for a server ID, adding it if new"""
+        node = self.node_index.get(server_id)
+        if node is None:
+            node = len(self.node_ids)
+            self.node_index[server_id] = node
+            self.node_ids.append(server_id)
+            self.reported.append(0)
+            self.version += 1
+        return node
+
+    def node(self, server_id: str) -> int:
+        """Get the integer node for a server ID, or None if unknown"""
+        return self.node_index.get(server_id)
+
+    def add_edges(self, server_id: str, edges: List[tuple], replace: bool = False):
+        """Add (destination, type, strength, latency, throughput) edges from a server"""
+        source = self.intern(server_id)
+        self.reported[source] = 1
+        sources, targets, types, strengths, latencies, throughputs = self._log
+        if replace:
+            self._replaced_before[source] = len(sources)
+        for dest_id, dep_type, strength, latency, throughput in edges:
+            type_code = self.type_index.get(dep_type)
+            if type_code is None:
+                type_code = self.type_index[dep_type] = len(self.type_names)
+                self.type_names.append(dep_type)
+
+            sources.append(source)
+            targets.append(self.intern(dest_id))
+            types.append(type_code)
+            strengths.append(strength)
+            latencies.append(latency)
+            throughputs.append(throughput)
+        self.version += 1
+
+    def compile(self):
+        """Compact the edge log into CSR arrays, keeping the latest copy of duplicate edges"""
+        if self._compiled_version == self.version:
+            return
+
+        sources, targets, types, strengths, latencies, throughputs = self._log
+        node_count = len(self.node_ids)
+
+        # Counting sort by source; later edges land after earlier ones within a source
+        counts = array('l', bytes(8 * (node_count + 1)))
+        for source in sources:
+            counts[source + 1] += 1
+        for node in range(node_count):
+            counts[node + 1] += counts[node]
+        slots = array('l', counts)
+        order = array('l', bytes(8 * len(sources)))
+        for position, source in enumerate(sources):
+            order[slots[source]] = position
+            slots[source] += 1
+
+        compacted = self._empty_edges()
+        offsets = array('l', [0])
+        for node in range(node_count):
+            seen = set()
+            kept = []
+            replaced_before = self._replaced_before.get(node, 0)
+            for index in range(counts[node + 1] - 1, counts[node] - 1, -1):
+                position = order[index]
+                if position < replaced_before:
+                    break
+                if targets[position] not in seen:
+                    seen.add(targets[position])
+                    kept.append(position)
+            for position in reversed(kept):
+                for column, values in zip(compacted, self._log):
+                    column.append(values[position])
+            offsets.append(len(compacted[0]))
+
+        self._log = compacted
+        self._replaced_before = {}
+        self.offsets = offsets
+        _, self.targets, self.types, self.strengths, self.latencies, self.throughputs = compacted
+        self._compiled_version = self.version
+
+    def edge_range(self, node: int) -> range:
+        """Get the CSR edge positions leaving a node"""
+        self.compile()
+        if node + 1 >= len(self.offsets):
+            return range(0)
+        return range(self.offsets[node], self.offsets[node + 1])
+
+    def successors(self, node: int) -> array:
+        """Get the nodes a node depends on"""
+        edges = self.edge_range(node)
+        return self.targets[edges.start:edges.stop]
+
+    def out_degree(self, node: int) -> int:
+        """Get the number of direct dependencies of a node"""
+        return len(self.edge_range(node))
+
+    def to_snapshot(self) -> dict:
+        """Serialize the graph's reported nodes and compacted edges"""
+        self.compile()
+        return {
+            'nodes': self.node_ids,
+            'reported': [node for node in range(len(self.node_ids)) if self.reported[node]],
+            'types': self.type_names,
+            'offsets': self.offsets.tolist(),
+            'targets': self.targets.tolist(),
+            'edgeTypes': self.types.tolist(),
+            'strengths': self.strengths.tolist(),
+            'latencies': self.latencies.tolist(),
+            'throughputs': self.throughputs.tolist()
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: dict) -> 'DependencyGraph':
+        """Rebuild a graph serialized by to_snapshot"""
+        graph = cls()
+        for server_id in snapshot['nodes']:
+            graph.intern(server_id)
+        for node in snapshot['reported']:
+            graph.reported[node] = 1
+        graph.type_names = list(snapshot['types'])
+        graph.type_index = {name: code for code, name in enumerate(graph.type_names)}
+
+        offsets = snapshot['offsets']
+        sources = array('i')
+        for node in range(len(offsets) - 1):
+            sources.extend([node] * (offsets[node + 1] - offsets[node]))
+        graph._log = (
+            sources,
+            array('i', snapshot['targets']),
+            array('H', snapshot['edgeTypes']),
+            array('d', snapshot['strengths']),
+            array('d', snapshot['latencies']),
+            array('d', snapshot['throughputs'])
+        )
+        graph.version += 1
+        return graph
+
+    def cached(self, name: str, compute):
+        """Get a whole-graph analysis result, recomputing it when the graph changes"""
+        cached = self._analysis_cache.get(name)
+        if cached is None or cached[0] != self.version:
+            self.compile()
+            cached = self._analysis_cache[name] = (self.version, compute())
+        return cached[1]
+
+    def strongly_connected_components(self) -> tuple:
+        """Label nodes with SCC numbers in reverse topological order (iterative Tarjan)"""
+        self.compile()
+        node_count = len(self.node_ids)
+        offsets, targets = self.offsets, self.targets
+        index = array('l', [-1]) * node_count
+        low = array('l', [0]) * node_count
+        component = array('l', [-1]) * node_count
+        on_stack = bytearray(node_count)
+        stack = []
+        counter = 0
+        component_count = 0
+
+        for root in range(node_count):
+            if index[root] != -1:
+                continue
+
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = 1
+            work = [[root, offsets[root]]]
+            while work:
+                frame = work[-1]
+                node, position = frame
+                if position < offsets[node + 1]:
+                    frame[1] += 1
+                    dep = targets[position]
+                    if index[dep] == -1:
+                        index[dep] = low[dep] = counter
+                        counter += 1
+                        stack.append(dep)
+                        on_stack[dep] = 1
+                        work.append([dep, offsets[dep]])
+                    elif on_stack[dep] and index[dep] < low[node]:
+                        low[node] = index[dep]
+                    continue
+
+                work.pop()
+                if work and low[node] < low[work[-1][0]]:
+                    low[work[-1][0]] = low[node]
+                if low[node] == index[node]:
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = 0
+                        component[member] = component_count
+                        if member == node:
+                            break
+                    component_count += 1
+
+        return component, component_count
+
+    def weakly_connected_components(self) -> tuple:
+        """Label nodes with weakly connected group numbers using union-find"""
+        self.compile()
+        node_count = len(self.node_ids)
+        parent = array('l', range(node_count))
+        size = array('l', [1]) * node_count
+
+        def find(node):
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        for source in range(node_count):
+            for position in range(self.offsets[source], self.offsets[source + 1]):
+                root_a, root_b = find(source), find(self.targets[position])
+                if root_a == root_b:
+                    continue
+                if size[root_a] < size[root_b]:
+                    root_a, root_b = root_b, root_a
+                parent[root_b] = root_a
+                size[root_a] += size[root_b]
+
+        # Number groups in order of first appearance so labels are deterministic
+        group = array('l', [-1]) * node_count
+        numbering = {}
+        for node in range(node_count):
+            group[node] = numbering.setdefault(find(node), len(numbering))
+        group_sizes = array('l', [0]) * len(numbering)
+        for node in range(node_count):
+            group_sizes[group[node]] += 1
+        return group, group_sizes
+
+    def degrees(self) -> tuple:
+        """Get the fan-in and fan-out of every node"""
+        self.compile()
+        node_count = len(self.node_ids)
+        fan_in = array('l', [0]) * node_count
+        for target in self.targets:
+            fan_in[target] += 1
+        fan_out = array('l', (self.offsets[node + 1] - self.offsets[node] for node in range(node_count)))
+        return fan_in, fan_out
+
+    def cut_points(self) -> tuple:
+        """Find articulation points and bridges of the undirected dependency graph"""
+        self.compile()
+        node_count = len(self.node_ids)
+
+        # Undirected simple graph: both edge directions, no self-loops or parallel edges
+        neighbours = [set() for _ in range(node_count)]
+        for source in range(node_count):
+            for position in range(self.offsets[source], self.offsets[source + 1]):
+                target = self.targets[position]
+                if target != source:
+                    neighbours[source].add(target)
+                    neighbours[target].add(source)
+        offsets = array('l', [0])
+        adjacency = array('i')
+        for node in range(node_count):
+            adjacency.extend(sorted(neighbours[node]))
+            offsets.append(len(adjacency))
+        del neighbours
+
+        discovery = array('l', [-1]) * node_count
+        low = array('l', [0]) * node_count
+        parent = array('l', [-1]) * node_count
+        articulation = bytearray(node_count)
+        bridges = []
+        counter = 0
+        for root in range(node_count):
+            if discovery[root] != -1:
+                continue
+
+            discovery[root] = low[root] = counter
+            counter += 1
+            root_children = 0
+            work = [[root, offsets[root]]]
+            while work:
+                frame = work[-1]
+                node, position = frame
+                if position < offsets[node + 1]:
+                    frame[1] += 1
+                    neighbour = adjacency[position]
+                    if discovery[neighbour] == -1:
+                        parent[neighbour] = node
+                        discovery[neighbour] = low[neighbour] = counter
+                        counter += 1
+                        if node == root:
+                            root_children += 1
+                        work.append([neighbour, offsets[neighbour]])
+                    elif neighbour != parent[node] and discovery[neighbour] < low[node]:
+                        low[node] = discovery[neighbour]
+                    continue
+
+                work.pop()
+                up = parent[node]
+                if up == -1:
+                    continue
+                if low[node] < low[up]:
+                    low[up] = low[node]
+                if low[node] > discovery[up]:
+                    bridges.append((up, node))
+                if up != root and low[node] >= discovery[up]:
+                    articulation[up] = 1
+
+            if root_children > 1:
+                articulation[root] = 1
+
+        return articulation, bridges
+
+    def _empty_edges(self) -> tuple:
+        return (array('i'), array('i'), array('H'), array('d'), array('d'), array('d'))
+
+class RawDataArchiver:
+    """Write-behind archiver that packs server records into compressed NDJSON chunks in S3"""
+
+    # S3 multipart parts must be at least 5 MB apart from the last one
+    MIN_PART_SIZE = 5 * 1024 * 1024
+
+    def __init__(self, s3, bucket: str, prefix: str = 'raw-data', chunk_records: int = 500,
+                 multipart_threshold: int = 16 * 1024 * 1024, part_size: int = 8 * 1024 * 1024):
+        """Initialize the archiver for one collection run"""
+        self.s3 = s3
+        self.bucket = bucket
+        self.prefix = prefix
+        self.chunk_records = chunk_records
+        self.multipart_threshold = multipart_threshold
+        self.part_size = max(part_size, self.MIN_PART_SIZE)
+        self.run_id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}-{uuid.uuid4().hex[:8]}"
+        self.manifest_key = f"{prefix}/manifests/{self.run_id}.json"
+        self.manifest_written = False
+        self.sequence = 0
+        self.manifest = {}
+        self.stats = {'records': 0, 'chunks': 0, 'bytes': 0, 'errors': 0}
+
+        # Manifest entries of chunks uploaded since the last drain_written call
+        self.written = {}
+        self.lock = threading.Lock()
+
+        # Bounded so a slow S3 applies backpressure instead of buffering the whole fleet
+        self.queue = queue.Queue(maxsize=2 * chunk_records)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def add(self, record: dict):
+        """Queue a server record for archival"""
+        self.queue.put(record)
+
+    def reference(self, server_id: str, location: dict):
+        """Point the run manifest at a record archived by an earlier run"""
+        with self.lock:
+            self.manifest[server_id] = location
+
+    def drain_written(self) -> Dict[str, dict]:
+        """Get the locations of records confirmed uploaded since the last call"""
+        with self.lock:
+            written, self.written = self.written, {}
+        return written
+
+    def close(self) -> dict:
+        """Flush buffered records, write the run manifest and stop the writer thread"""
+        self.queue.put(None)
+        self.thread.join()
+        if self.manifest:
+            try:
+                self.s3.put_object(
+                    Bucket=self.bucket,
+                    Key=self.manifest_key,
+                    Body=json.dumps({'runId': self.run_id, 'servers': self.manifest}),
+                    ContentType='application/json'
+                )
+                self.manifest_written = True
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"Error writing raw data manifest: {str(e)}")
+        return self.stats
+
+    def _run(self):
+        buffer = []
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+            buffer.append(record)
+            if len(buffer) >= self.chunk_records:
+                self._write_chunk(buffer)
+                buffer = []
+        if buffer:
+            self._write_chunk(buffer)
+
+    def _write_chunk(self, records: List[dict]):
+        """Write records as one chunk, each its own gzip member so it can be range-read"""
+        key = f"{self.prefix}/chunks/{self.run_id}/{self.sequence:05d}.ndjson.gz"
+        self.sequence += 1
+
+        body = bytearray()
+        entries = {}
+        for record in records:
+            member = gzip.compress((json.dumps(record) + '\n').encode('utf-8'))
+            entries[record['basic']['serverId']] = {
+                'key': key,
+                'offset': len(body),
+                'length': len(member),
+                'lastUpdated': record.get('lastUpdated')
+            }
+            body += member
+
+        try:
+            if len(body) >= self.multipart_threshold:
+                self._multipart_upload(key, body)
+            else:
+                self.s3.put_object(
+                    Bucket=self.bucket,
+                    Key=key,
+                    Body=bytes(body),
+                    ContentType='application/x-ndjson'
+                )
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"Error archiving raw data chunk {key}: {str(e)}")
+            return
+
+        with self.lock:
+            self.manifest.update(entries)
+            self.written.update(entries)
+        self.stats['records'] += len(records)
+        self.stats['chunks'] += 1
+        self.stats['bytes'] += len(body)
+
+    def _multipart_upload(self, key: str, body: bytearray):
+        upload_id = self.s3.create_multipart_upload(
+            Bucket=self.bucket,
+            Key=key,
+            ContentType='application/x-ndjson'
+        )['UploadId']
+        try:
+            parts = []
+            view = memoryview(body)
+            for number, start in enumerate(range(0, len(body), self.part_size), start=1):
+                response = self.s3.upload_part(
+                    Bucket=self.bucket,
+                    Key=key,
+                    UploadId=upload_id,
+                    PartNumber=number,
+                    Body=bytes(view[start:start + self.part_size])
+                )
+                parts.append({'PartNumber': number, 'ETag': response['ETag']})
+            self.s3.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+        except Exception:
+            self.s3.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
+
+class MetricTrendEngine:
+    """Columnar store of utilization histories, analyzed for every server and metric in one pass"""
+
+    PERCENTILES = (50, 95, 99)
+
+    # Growth beyond this percentage either way counts as a trend
+    TREND_THRESHOLD = 10
+
+    def __init__(self):
+        """Initialize empty ragged sample buffers"""
+        self.keys = []
+        self.current = array('d')
+
+        # Samples of row i are values[offsets[i]:offsets[i + 1]]
+        self.offsets = array('q', [0])
+        self.values = array('d')
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, key, current, history: list) -> bool:
+        """Append one metric series, skipping it when it holds non-numeric samples"""
+        try:
+            samples = [float(value) for value in history]
+            current = float(current or 0)
+        except (TypeError, ValueError):
+            return False
+
+        self.keys.append(key)
+        self.current.append(current)
+        self.values.extend(samples)
+        self.offsets.append(len(self.values))
+        return True
+
+    def analyze(self) -> List[dict]:
+        """Get the trend of every row, in insertion order"""
+        values, offsets = self.values, self.offsets
+        trends = []
+        for row, current in enumerate(self.current):
+            start, end = offsets[row], offsets[row + 1]
+            count = end - start
+            if not count:
+                trends.append({'trend': 'stable', 'growth_rate': 0})
+                continue
+
+            samples = values[start:end]
+            total = sum(samples)
+            mean = total / count
+
+            # Least-squares slope against sample index, from closed-form sums
+            slope = 0.0
+            if count > 1:
+                sum_x = count * (count - 1) / 2
+                sum_xx = (count - 1) * count * (2 * count - 1) / 6
+                sum_xy = sum(map(operator.mul, range(count), samples))
+                slope = (count * sum_xy - sum_x * total) / (count * sum_xx - sum_x * sum_x)
+            variance = max(0.0, sum(map(operator.mul, samples, samples)) / count - mean * mean)
+
+            first = samples[0]
+            growth_rate = (current - first) / first * 100 if first != 0 else 0
+            ordered = sorted(samples)
+
+            trend = {
+                'trend': ('increasing' if growth_rate > self.TREND_THRESHOLD
+                          else 'decreasing' if growth_rate < -self.TREND_THRESHOLD
+                          else 'stable'),
+                'growth_rate': round(growth_rate, 2),
+                'average': round(mean, 2),
+                'peak': max(ordered[-1], current),
+                'slope': round(slope, 4),
+                'volatility': round(variance ** 0.5, 2)
+            }
+            for percentile in self.PERCENTILES:
+                trend[f'p{percentile}'] = round(self._percentile(ordered, percentile), 2)
+            trends.append(trend)
+        return trends
+
+    def _percentile(self, ordered: list, percentile: float) -> float:
+        """Get a percentile of sorted samples, interpolating linearly between ranks"""
+        rank = percentile / 100 * (len(ordered) - 1)
+        lower = int(rank)
+        upper = min(lower + 1, len(ordered) - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+class QuantileSketch:
+    """Mergeable log-bucketed quantile sketch with bounded relative error (DDSketch)"""
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 1024):
+        """Initialize an empty sketch"""
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.max_bins = max_bins
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        """Add one non-negative sample"""
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value <= 0:
+            self.zero_count += 1
+            return
+
+        index = math.ceil(math.log(value) / self.log_gamma)
+        self.bins[index] = self.bins.get(index, 0) + 1
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def merge(self, other: 'QuantileSketch'):
+        """Fold another sketch with the same accuracy into this one"""
+        if other.gamma != self.gamma:
+            raise ValueError("Can't merge quantile sketches with different accuracy")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def quantile(self, q: float) -> float:
+        """Get the approximate q-quantile, or 0 when the sketch is empty"""
+        if not self.count:
+            return 0.0
+
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return max(self.min, 0.0)
+
+        cumulative = self.zero_count
+        for index in sorted(self.bins):
+            cumulative += self.bins[index]
+            if cumulative > rank:
+                estimate = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def _collapse(self):
+        """Fold the lowest buckets together so the sketch stays within max_bins"""
+        indexes = sorted(self.bins)
+        excess = len(indexes) - self.max_bins
+        folded = sum(self.bins.pop(index) for index in indexes[:excess])
+        self.bins[indexes[excess]] += folded
+
+class TrafficAggregator:
+    """Constant-memory hour-of-week throughput accumulators and sketch for one interface"""
+
+    HOURS_PER_WEEK = 7 * 24
+
+    def __init__(self):
+        """Initialize empty hour-of-week cells, indexed by weekday * 24 + hour"""
+        self.counts = array('q', [0]) * self.HOURS_PER_WEEK
+        self.totals = array('d', [0.0]) * self.HOURS_PER_WEEK
+        self.peaks = array('d', [0.0]) * self.HOURS_PER_WEEK
+        self.sketch = QuantileSketch()
+
+    def __len__(self) -> int:
+        return self.sketch.count
+
+    def add(self, timestamp: datetime, throughput: float):
+        """Accumulate one throughput sample"""
+        if throughput < 0:
+            return
+        cell = timestamp.weekday() * 24 + timestamp.hour
+        self.counts[cell] += 1
+        self.totals[cell] += throughput
+        if throughput > self.peaks[cell]:
+            self.peaks[cell] = throughput
+        self.sketch.add(throughput)
+
+    def merge(self, other: 'TrafficAggregator'):
+        """Fold in the accumulators of another stream of the same interface"""
+        for cell in range(self.HOURS_PER_WEEK):
+            self.counts[cell] += other.counts[cell]
+            self.totals[cell] += other.totals[cell]
+            self.peaks[cell] = max(self.peaks[cell], other.peaks[cell])
+        self.sketch.merge(other.sketch)
+
+    def average(self, cell: int) -> float:
+        """Get the mean throughput of an hour-of-week cell"""
+        return self.totals[cell] / self.counts[cell] if self.counts[cell] else 0.0
+
+    def mean(self) -> float:
+        """Get the mean throughput over all samples"""
+        return sum(self.totals) / len(self) if len(self) else 0.0
+
+class TrafficAnomalyDetector:
+    """Online seasonal anomaly detector with columnar, constant-size state per throughput series"""
+
+    HOURS_PER_WEEK = 7 * 24
+    HOURS_PER_DAY = 24
+
+    # Residuals a cell, or the series as a whole, needs before its variance is trusted
+    MIN_CELL_RESIDUALS = 2
+    MIN_SERIES_RESIDUALS = 6
+
+    # Minimum scale during warmup as a fraction of the expected value, so the winsorizing of
+    # early samples clips wild spikes without flattening the first day's busy hours
+    WARMUP_RELATIVE_SCALE = 2.0
+
+    def __init__(self, threshold: float = 5.0, high_threshold: float = 8.0, season_alpha: float = 0.3,
+                 scale_alpha: float = 0.05, warmup: int = 24):
+        """Initialize the detector with no series"""
+        self.threshold = threshold
+        self.high_threshold = high_threshold
+        self.season_alpha = season_alpha
+        self.scale_alpha = scale_alpha
+        self.warmup = warmup
+        self.keys = []
+
+        # Seasonal baselines with their own residual variance: EWMAs of each series' hour-of-week
+        # cells at series * 168 + cell, of its hour-of-day cells at series * 24 + hour, and of
+        # the series as a whole. A cell not seen yet is predicted by the next coarser level
+        self.weekly = self._empty_level()
+        self.daily = self._empty_level()
+        self.overall = self._empty_level()
+        self.last_seen = array('d')
+        self.interval = array('d')
+
+        # Open anomaly window per series; sign 0 means none is open
+        self.window_sign = array('b')
+        self.window_start = array('d')
+        self.window_score = array('d')
+        self.window_value = array('d')
+        self.window_expected = array('d')
+        self.anomalies = []
+
+    def add_series(self, key) -> int:
+        """Register a series and get its index"""
+        self.keys.append(key)
+        for level, cells in ((self.weekly, self.HOURS_PER_WEEK), (self.daily, self.HOURS_PER_DAY),
+                             (self.overall, 1)):
+            level['baseline'].extend(array('d', [0.0]) * cells)
+            level['variance'].extend(array('d', [0.0]) * cells)
+            level['counts'].extend(array('I', [0]) * cells)
+            level['residuals'].extend(array('I', [0]) * cells)
+        for column in (self.last_seen, self.interval, self.window_start,
+                       self.window_score, self.window_value, self.window_expected):
+            column.append(0.0)
+        self.window_sign.append(0)
+        return len(self.keys) - 1
+
+    def update(self, series: int, timestamp: datetime, value: float):
+        """Score one sample of a series, which must arrive in time order"""
+        seconds = (timestamp - datetime(1970, 1, 1)).total_seconds()
+        samples = self.overall['counts'][series]
+        if samples:
+            if seconds <= self.last_seen[series]:
+                return
+            self.interval[series] = seconds - self.last_seen[series]
+        self.last_seen[series] = seconds
+
+        hour = timestamp.hour
+        levels = (
+            (self.weekly, series * self.HOURS_PER_WEEK + timestamp.weekday() * 24 + hour),
+            (self.daily, series * self.HOURS_PER_DAY + hour),
+            (self.overall, series)
+        )
+
+        # The finest level seen before predicts the sample; the finest with a few residuals
+        # supplies the scale, so busy and quiet hours are scored against their own spread
+        expected = variance = None
+        seasonal = False
+        for level, cell in levels:
+            if level['counts'][cell] and expected is None:
+                expected = level['baseline'][cell]
+                seasonal = level is not self.overall
+            minimum = self.MIN_SERIES_RESIDUALS if level is self.overall else self.MIN_CELL_RESIDUALS
+            if level['residuals'][cell] >= minimum and variance is None:
+                variance = level['variance'][cell]
+
+        score = 0.0
+        sign = 0
+        learned = value
+        if expected is not None:
+            # Until the warmup has settled the spread, deviations are bounded relative to the level
+            relative_floor = 0.01 if samples >= self.warmup else self.WARMUP_RELATIVE_SCALE
+            scale = max((variance or 0.0) ** 0.5, relative_floor * abs(expected), 1e-9)
+            residual = value - expected
+            if samples >= self.warmup and variance is not None:
+                score = residual / scale
+                sign = (score > 0) - (score < 0) if abs(score) >= self.threshold else 0
+
+            # Every level learns from the sample winsorized to the threshold, so a spike can't
+            # skew even a cell's first baseline, while a lasting level shift is still absorbed
+            bound = self.threshold * scale
+            learned = expected + min(max(residual, -bound), bound)
+
+        if sign != self.window_sign[series] and self.window_sign[series]:
+            self._close(series, seconds - self.window_start[series])
+        if sign:
+            if not self.window_sign[series]:
+                self.window_sign[series] = sign
+                self.window_start[series] = seconds
+                self.window_score[series] = 0.0
+            if abs(score) > abs(self.window_score[series]):
+                self.window_score[series] = score
+                self.window_value[series] = value
+                self.window_expected[series] = expected
+
+        for level, cell in levels:
+            seen = level['counts'][cell]
+            level['counts'][cell] = seen + 1
+            if not seen:
+                level['baseline'][cell] = learned
+                continue
+            residual = learned - level['baseline'][cell]
+            level['baseline'][cell] += max(self.season_alpha, 1 / (seen + 1)) * residual
+
+            # The series-wide variance only learns from seasonal predictions, so it doesn't
+            # absorb the daily swing between busy and quiet hours around the flat series level
+            if level is self.overall:
+                if not seasonal:
+                    continue
+                residual = learned - expected
+            level['residuals'][cell] += 1
+            level['variance'][cell] += max(self.scale_alpha, 1 / level['residuals'][cell]) * (
+                residual * residual - level['variance'][cell])
+
+    def finish(self) -> List[List[dict]]:
+        """Close windows still open at the end of each series and get every series' anomalies"""
+        for series in range(len(self.keys)):
+            if self.window_sign[series]:
+                self._close(series, self.last_seen[series] - self.window_start[series]
+                            + self.interval[series])
+
+        anomalies = [[] for _ in self.keys]
+        for series, anomaly in self.anomalies:
+            anomalies[series].append(anomaly)
+        return anomalies
+
+    def _close(self, series: int, duration: float):
+        """Emit the open anomaly window of a series"""
+        score = self.window_score[series]
+        self.anomalies.append((series, {
+            'timestamp': datetime.utcfromtimestamp(
+                self.window_start[series]).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'type': 'spike' if self.window_sign[series] > 0 else 'drop',
+            'magnitude': 'high' if abs(score) >= self.high_threshold else 'medium',
+            'score': round(score, 2),
+            'throughput': round(self.window_value[series], 2),
+            'expected_throughput': round(self.window_expected[series], 2),
+            'duration': int(duration)
+        }))
+        self.window_sign[series] = 0
+
+    def _empty_level(self) -> dict:
+        return {'baseline': array('d'), 'variance': array('d'), 'counts': array('I'), 'residuals': array('I')}
+
+class IPIndex:
+    """Fleet-wide IP index: exact host addresses to servers, CIDR blocks to subnets by longest prefix"""
+
+    ADDRESS_BITS = {4: 32, 6: 128}
+
+    def __init__(self):
+        """Initialize an empty index with one binary trie per IP version"""
+        # (version, address as int) -> (server ID, interface ID)
+        self.hosts = {}
+        self.subnets = []
+        self.subnet_index = {}
+
+        # Trie nodes live in flat arrays; node 0 is the root, so child 0 means no child
+        self.tries = {
+            version: {'zero': array('i', [0]), 'one': array('i', [0]), 'subnet': array('i', [-1])}
+            for version in self.ADDRESS_BITS
+        }
+
+    def __len__(self) -> int:
+        return len(self.hosts)
+
+    def add_host(self, address: str, server_id: str, interface_id: str = '') -> bool:
+        """Map a host address to a server, replacing any previous owner"""
+        key = self._parse(address)
+        if key is None:
+            return False
+        self.hosts[key] = (server_id, interface_id)
+        return True
+
+    def add_subnet(self, cidr: str, subnet_id: str = '') -> bool:
+        """Insert a CIDR block into the trie of its IP version"""
+        try:
+            network = ipaddress.ip_network(cidr.strip(), strict=False)
+        except (AttributeError, ValueError):
+            return False
+
+        key = (network.version, str(network))
+        if key in self.subnet_index:
+            return True
+        self.subnet_index[key] = len(self.subnets)
+        self.subnets.append({'subnetId': subnet_id, 'cidr': str(network)})
+
+        trie = self.tries[network.version]
+        bits = self.ADDRESS_BITS[network.version]
+        prefix = int(network.network_address)
+        node = 0
+        for position in range(network.prefixlen):
+            branch = trie['one'] if (prefix >> (bits - 1 - position)) & 1 else trie['zero']
+            if not branch[node]:
+                branch[node] = len(trie['subnet'])
+                for column in (trie['zero'], trie['one']):
+                    column.append(0)
+                trie['subnet'].append(-1)
+            node = branch[node]
+        trie['subnet'][node] = self.subnet_index[key]
+        return True
+
+    def add_interfaces(self, server_id: str, interfaces: List[dict]):
+        """Index the addresses and subnets of a server's analyzed network interfaces"""
+        for interface in interfaces:
+            addresses = interface.get('ip_addresses', {})
+            hosts = [addresses.get('private'), addresses.get('public'), *addresses.get('aliases', [])]
+            for address in hosts:
+                if address:
+                    self.add_host(address, server_id, interface.get('id', ''))
+
+            subnet = interface.get('subnet', {})
+            if subnet.get('cidr'):
+                self.add_subnet(subnet['cidr'], subnet.get('id', ''))
+
+    def resolve(self, address: str) -> dict:
+        """Resolve an address to its server, else its most specific subnet, else None"""
+        key = self._parse(address)
+        if key is None:
+            return None
+
+        host = self.hosts.get(key)
+        if host:
+            return {'type': 'server', 'serverId': host[0], 'interfaceId': host[1]}
+
+        version, value = key
+        trie = self.tries[version]
+        zero, one, subnets = trie['zero'], trie['one'], trie['subnet']
+        bits = self.ADDRESS_BITS[version]
+        node, match = 0, subnets[0]
+        for position in range(bits):
+            node = (one if (value >> (bits - 1 - position)) & 1 else zero)[node]
+            if not node:
+                break
+            if subnets[node] >= 0:
+                match = subnets[node]
+
+        if match < 0:
+            return None
+        return {'type': 'subnet', **self.subnets[match]}
+
+    def to_snapshot(self) -> dict:
+        """Serialize the indexed hosts and subnets"""
+        return {
+            'hosts': [[version, value, *owner] for (version, value), owner in self.hosts.items()],
+            'subnets': self.subnets
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: dict) -> 'IPIndex':
+        """Rebuild an index serialized by to_snapshot"""
+        index = cls()
+        for version, value, server_id, interface_id in snapshot.get('hosts', []):
+            index.hosts[(version, value)] = (server_id, interface_id)
+        for subnet in snapshot.get('subnets', []):
+            index.add_subnet(subnet['cidr'], subnet['subnetId'])
+        return index
+
+    def _parse(self, address: str) -> tuple:
+        """Get (version, address as int) for an IPv4 or IPv6 address, or None"""
+        if not isinstance(address, str):
+            return None
+        address = address.strip()
+        for family, version in ((socket.AF_INET, 4), (socket.AF_INET6, 6)):
+            try:
+                return version, int.from_bytes(socket.inet_pton(family, address), 'big')
+            except (OSError, ValueError):
+                continue
+        return None
+
+class VulnerabilityIndex:
+    """Offline CVE index: per product, sorted version boundaries and the CVEs active after each"""
+
+    # Tags that order before the release they qualify (2.0-beta9 < 2.0); other letters order
+    # after it (1.0.1f > 1.0.1, 8.5p1 > 8.5)
+    PRE_RELEASE_TAGS = {'dev', 'alpha', 'a', 'beta', 'b', 'pre', 'preview', 'rc', 'c', 'm', 'milestone'}
+
+    # Version key components: pre-release tag < end of version < other letters < numbers
+    END_OF_VERSION = (-1, '')
+    LAST_AFFECTED_END = (math.inf, '')
+
+    def __init__(self, vulnerabilities: List[dict]):
+        """Index the affected version ranges of feed entries by normalized product name"""
+        self.vulnerabilities = []
+        self.products = {}
+        self._matches = {}
+        self._names = {}
+
+        ranges = {}
+        for entry in vulnerabilities:
+            index = len(self.vulnerabilities)
+            self.vulnerabilities.append({
+                'id': entry['id'],
+                'severity': entry.get('severity', 'unknown').lower(),
+                'cvss': entry.get('cvss', 0),
+                'summary': entry.get('summary', '')
+            })
+            for affected in entry.get('affected', []):
+                start = self.version_key(affected['introduced']) if affected.get('introduced') else ()
+                if affected.get('fixed'):
+                    end = self.version_key(affected['fixed'])
+                elif affected.get('lastAffected'):
+                    end = self.version_key(affected['lastAffected'])[:-1] + (self.LAST_AFFECTED_END,)
+                else:
+                    end = None
+                for product in entry.get('products', []):
+                    ranges.setdefault(self.normalize_name(product), []).append(
+                        (start, end, index, affected.get('fixed'))
+                    )
+
+        # Each boundary starts an interval in which the same set of CVEs applies
+        for product, product_ranges in ranges.items():
+            boundaries = sorted(
+                {start for start, _, _, _ in product_ranges}
+                | {end for _, end, _, _ in product_ranges if end is not None}
+            )
+            active = [
+                tuple((index, fixed) for start, end, index, fixed in product_ranges
+                      if start <= boundary and (end is None or boundary < end))
+                for boundary in boundaries
+            ]
+            self.products[product] = (boundaries, active)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'VulnerabilityIndex':
+        """Load a feed snapshot, or get an empty index when it can't be read"""
+        try:
+            with open(path, 'r') as f:
+                feed = json.load(f)
+            return cls(feed.get('vulnerabilities', []))
+        except Exception as e:
+            print(f"Error loading vulnerability feed {path}: {str(e)}")
+            return cls([])
+
+    def __len__(self) -> int:
+        return len(self.vulnerabilities)
+
+    @classmethod
+    def normalize_name(cls, name: str) -> str:
+        """Lowercase a product name and collapse punctuation to single spaces"""
+        return re.sub(r'[^a-z0-9]+', ' ', str(name).lower()).strip()
+
+    @classmethod
+    def version_key(cls, version: str) -> tuple:
+        """Get a sortable key for a version string"""
+        key = []
+        zeros = 0
+        for token in re.findall(r'\d+|[a-z]+', str(version).lower()):
+            if token.isdigit():
+                if int(token) == 0:
+                    zeros += 1
+                    continue
+                key.extend([(0, '')] * zeros)
+                key.append((int(token), ''))
+            else:
+                # Zeros before a tag or the end are dropped, so 2.0 == 2 and 2.0-rc1 == 2-rc1
+                key.append((-2 if token in cls.PRE_RELEASE_TAGS else -0.5, token))
+            zeros = 0
+        key.append(cls.END_OF_VERSION)
+        return tuple(key)
+
+    def match(self, name: str, version: str) -> List[dict]:
+        """Get the CVEs affecting a product version, each with the version that fixes it"""
+        cache_key = (name, version)
+        if cache_key not in self._matches:
+            if name not in self._names:
+                self._names[name] = self.normalize_name(name)
+            entry = self.products.get(self._names[name])
+            found = ()
+            if entry and version and version != 'unknown':
+                boundaries, active = entry
+                position = bisect_right(boundaries, self.version_key(version)) - 1
+                if position >= 0:
+                    found = active[position]
+            self._matches[cache_key] = found
+
+        return [
+            {**self.vulnerabilities[index], 'fixedVersion': fixed}
+            for index, fixed in self._matches[cache_key]
+        ]
+
+class OSLifecycleCatalog:
+    """OS support lifecycle: per distribution, sorted release version ranges and support end dates"""
+
+    def __init__(self, distributions: List[dict]):
+        """Index release ranges by distribution, matching names longest alias first"""
+        self.aliases = []
+        self.releases = []
+        for position, distribution in enumerate(distributions):
+            for name in distribution.get('names', []):
+                self.aliases.append((VulnerabilityIndex.normalize_name(name), position))
+
+            releases = sorted(
+                (VulnerabilityIndex.version_key(release['from']),
+                 VulnerabilityIndex.version_key(release['to']),
+                 release['from'],
+                 date.fromisoformat(release['endOfSupport']))
+                for release in distribution.get('releases', [])
+            )
+            self.releases.append(([release[0] for release in releases], releases))
+        self.aliases.sort(key=lambda alias: -len(alias[0]))
+
+    @classmethod
+    def from_file(cls, path: str) -> 'OSLifecycleCatalog':
+        """Load a catalog, or get an empty one when it can't be read"""
+        try:
+            with open(path, 'r') as f:
+                return cls(json.load(f).get('distributions', []))
+        except Exception as e:
+            print(f"Error loading OS lifecycle catalog {path}: {str(e)}")
+            return cls([])
+
+    def lookup(self, os_name: str, os_version: str) -> tuple:
+        """Get the (release, end of support date) of an OS version, or None when it isn't cataloged"""
+        name = f" {VulnerabilityIndex.normalize_name(os_name)} "
+        for alias, position in self.aliases:
+            index = name.find(f" {alias} ")
+            if index < 0:
+                continue
+
+            # Releases named in the OS name (Windows Server 2019) are tried after the version
+            for candidate in (os_version, name[index + len(alias) + 2:]):
+                if not candidate:
+                    continue
+                starts, releases = self.releases[position]
+                key = VulnerabilityIndex.version_key(candidate)
+                found = bisect_right(starts, key) - 1
+                if found >= 0 and key < releases[found][1]:
+                    return releases[found][2], releases[found][3]
+            return None
+        return None
+
+    def verdict(self, os_name: str, os_version: str, warning_days: int, today: date = None) -> dict:
+        """Classify an OS version as supported, eol_soon, eol or unknown"""
+        found = self.lookup(os_name, os_version)
+        if found is None:
+            return {'status': 'unknown', 'release': None, 'endOfSupport': None}
+
+        release, end_of_support = found
+        today = today or datetime.utcnow().date()
+        if today > end_of_support:
+            status = 'eol'
+        elif (end_of_support - today).days <= warning_days:
+            status = 'eol_soon'
+        else:
+            status = 'supported'
+        return {'status': status, 'release': release, 'endOfSupport': end_of_support.isoformat()}
+
+class ComplianceRuleSet:
+    """Declarative compliance rules, compiled once into field getters and column predicates"""
+
+    COMPARISONS = {
+        'eq': operator.eq, 'ne': operator.ne,
+        'lt': operator.lt, 'lte': operator.le,
+        'gt': operator.gt, 'gte': operator.ge
+    }
+
+    def __init__(self, rules: List[dict]):
+        """Compile rules, hashing each so results can be memoized across rule changes"""
+        self.rules = [self.compile_rule(rule) for rule in rules]
+        self.version = hashlib.sha256(
+            ''.join(compiled['hash'] for compiled in self.rules).encode('utf-8')
+        ).hexdigest()[:12]
+
+    @classmethod
+    def from_file(cls, path: str) -> 'ComplianceRuleSet':
+        """Load rules from a JSON file, or get an empty rule set when it can't be read"""
+        try:
+            with open(path, 'r') as f:
+                return cls(json.load(f).get('rules', []))
+        except Exception as e:
+            print(f"Error loading compliance rules {path}: {str(e)}")
+            return cls([])
+
+    def compile_rule(self, rule: dict) -> dict:
+        """Compile a rule into a getter for its field and a predicate over a column of values"""
+        check = self._compile_check(rule['operator'], rule.get('value'))
+
+        def predicate(column: list) -> list:
+            outcomes = []
+            for value in column:
+                try:
+                    outcomes.append(None if value is None else check(value))
+                except (TypeError, ValueError):
+                    outcomes.append(None)
+            return outcomes
+
+        return {
+            'rule': rule,
+            'hash': hashlib.sha256(json.dumps(rule, sort_keys=True).encode('utf-8')).hexdigest(),
+            'get': self._compile_getter(rule['field']),
+            'test': predicate,
+            # Outcomes of age rules change from day to day, even for an unchanged record
+            'volatile': rule['operator'] == 'max_age_days'
+        }
+
+    def evaluate(self, records: List[dict], memo: OrderedDict, memo_size: int) -> List[list]:
+        """Evaluate every rule column-wise, reusing memoized (rule, field value) outcomes"""
+        outcomes = [[None] * len(self.rules) for _ in records]
+        today = datetime.utcnow().date().isoformat()
+        for position, compiled in enumerate(self.rules):
+            column = [compiled['get'](record) for record in records]
+            keys = [
+                (compiled['hash'], self.memo_key(value), today if compiled['volatile'] else None)
+                for value in column
+            ]
+
+            # Rows sharing a value are checked once; the rest are filled in from the memo
+            pending = {}
+            for row, key in enumerate(keys):
+                if key in memo:
+                    memo.move_to_end(key)
+                elif key not in pending:
+                    pending[key] = row
+            rows = list(pending.values())
+            for row, passed in zip(rows, compiled['test']([column[row] for row in rows])):
+                memo[keys[row]] = None if passed is None else (passed, column[row])
+            for row, key in enumerate(keys):
+                outcomes[row][position] = memo[key]
+
+            while len(memo) > memo_size:
+                memo.popitem(last=False)
+        return outcomes
+
+    @classmethod
+    def memo_key(cls, value):
+        """Get a hashable stand-in for an extracted field value, telling apart 1, 1.0 and True"""
+        if isinstance(value, list):
+            return tuple(cls.memo_key(item) for item in value)
+        if isinstance(value, dict):
+            return tuple(sorted((key, cls.memo_key(item)) for key, item in value.items()))
+        return type(value).__name__, value
+
+    def _compile_getter(self, field: str):
+        """Build a getter for a dotted field path, where '*' collects from every list item"""
+        parts = field.split('.')
+        collects = '*' in parts
+
+        def get(record: dict):
+            values = [record]
+            for part in parts:
+                if part == '*':
+                    values = [item for value in values if isinstance(value, list) for item in value]
+                else:
+                    values = [value.get(part) for value in values if isinstance(value, dict)]
+                    values = [value for value in values if value is not None]
+
+            if not collects:
+                return values[0] if values else None
+            collected = []
+            for value in values:
+                collected.extend(value if isinstance(value, list) else [value])
+            return collected or None
+
+        return get
+
+    def _compile_check(self, name: str, expected):
+        """Build the check of one operator, returning whether an observed value passes"""
+        if name in self.COMPARISONS:
+            compare = self.COMPARISONS[name]
+            return lambda value: compare(value, expected)
+        if name == 'in':
+            allowed = set(expected)
+            return lambda value: value in allowed
+        if name == 'not_in':
+            denied = set(expected)
+            return lambda value: value not in denied
+        if name == 'disjoint':
+            denied = {str(item) for item in expected}
+            return lambda values: not denied.intersection(str(value) for value in values)
+        if name == 'max_age_days':
+            def check_age(value):
+                if isinstance(value, str):
+                    value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+                if value.tzinfo is not None:
+                    value = value.astimezone(timezone.utc).replace(tzinfo=None)
+                return datetime.utcnow() - value <= timedelta(days=expected)
+            return check_age
+        if name == 'os_lifecycle':
+            failing = set(expected.get('fail', []))
+            skipped = set(expected.get('skip', [])) | {'unknown'}
+            return lambda lifecycle: (None if lifecycle['status'] in skipped
+                                      else lifecycle['status'] not in failing)
+        raise ValueError(f"Unknown compliance operator: {name}")
+
+def _betweenness_worker(connection, graph, pivots: List[int], deadline: float):
+    """Accumulate unnormalized betweenness from a share of the sampled pivots"""
+    totals = {}
+    processed = 0
+    for pivot in pivots:
+        if time.monotonic() >= deadline:
+            break
+        partial = networkx.betweenness_centrality_subset(graph, [pivot], graph.nodes, normalized=False)
+        for node, value in partial.items():
+            if value:
+                totals[node] = totals.get(node, 0.0) + value
+        processed += 1
+
+    if connection is None:
+        return totals, processed
+    connection.send((totals, processed))
+    connection.close()
+
+class EnhancedDiscoveryProcessor:
+    # Maximum number of serverIds each Discovery API accepts in a single call
+    BATCH_LIMITS = {
+        'describe_servers': 100,
+        'describe_server_information': 100,
+        'get_server_utilization_metrics': 100,
+        'list_server_applications': 100,
+        'describe_server_dependencies': 50,
+        'describe_server_network_info': 100
+    }
+
+    # Per-server Discovery calls that can be prefetched in batches: (method, result key, owner field)
+    BATCHED_CALLS = [
+        ('describe_server_information', 'serverInfo', 'serverId'),
+        ('get_server_utilization_metrics', 'utilizationMetrics', 'serverId'),
+        ('list_server_applications', 'applications', 'serverId'),
+        ('describe_server_dependencies', 'dependencies', 'sourceServerId'),
+        ('describe_server_network_info', 'networkInfo', 'serverId')
+    ]
+
+    # Batched calls of the indexing pass, and of the enrichment pass that follows it
+    INDEX_CALLS = ('describe_server_dependencies', 'describe_server_network_info')
+    ENRICH_CALLS = (
+        'describe_server_information',
+        'get_server_utilization_metrics',
+        'list_server_applications',
+        'describe_server_network_info'
+    )
+
+    # Indirect dependencies are followed at most this many hops
+    MAX_DEPENDENCY_DEPTH = 11
+
+    # Number of per-server reachability indexes kept between queries
+    REACHABILITY_CACHE_SIZE = 256
+
+    # Edge attribute used to weight critical paths: 'latency' or 'strength'
+    CRITICAL_PATH_WEIGHT = os.environ.get('CRITICAL_PATH_WEIGHT', 'latency')
+
+    # Utilization metrics whose histories are analyzed for trends
+    TREND_METRICS = ('cpu', 'memory', 'storage', 'network')
+
+    # Discovery table sort key under which each server's record fingerprint is kept
+    FINGERPRINT_KEY = 'FINGERPRINT'
+
+    # Archive location fields kept with each fingerprint, so unchanged records can be referenced
+    ARCHIVE_LOCATION_FIELDS = ('key', 'offset', 'length', 'lastUpdated')
+
+    # Discovery table sort key under which each server's last synced agent update is kept
+    SYNC_KEY = 'SYNC'
+
+    # Server fields that may carry the agent's last update time, in order of preference
+    AGENT_UPDATED_FIELDS = ('agentLastUpdated', 'lastUpdatedTime', 'lastUpdated')
+
+    # S3 key of the persisted dependency graph used by incremental runs
+    GRAPH_SNAPSHOT_KEY = 'dependency-graph/snapshot.json.gz'
+
+    # Discovery table sort key under which each server's cached record is kept
+    RESULT_CACHE_KEY = 'RESULT'
+
+    # Seconds a cached record is served before the server is collected live again
+    RESULT_CACHE_TTL = int(os.environ.get('RESULT_CACHE_TTL', '3600'))
+
+    # Compressed records larger than this aren't cached, since DynamoDB items max out at 400 KB
+    RESULT_CACHE_MAX_BYTES = 350 * 1024
+
+    # Days before an OS release's end of support at which it is flagged as ending soon
+    OS_EOL_WARNING_DAYS = int(os.environ.get('OS_EOL_WARNING_DAYS', '180'))
+
+    # Memoized (rule, field value) compliance outcomes kept by a warm container
+    COMPLIANCE_MEMO_SIZE = int(os.environ.get('COMPLIANCE_MEMO_SIZE', '20000'))
+
+    # Maximum keys per DynamoDB BatchGetItem request
+    DYNAMODB_BATCH_GET_LIMIT = 100
+
+    # Sampled betweenness centrality: pivot count, worker processes and time budget in seconds
+    CENTRALITY_SAMPLES = int(os.environ.get('CENTRALITY_SAMPLES', '64'))
+    CENTRALITY_WORKERS = int(os.environ.get('CENTRALITY_WORKERS', '2'))
+    CENTRALITY_TIME_BUDGET = float(os.environ.get('CENTRALITY_TIME_BUDGET', '2'))
+
+    # Approximate centrality is only recomputed once the graph has grown by this fraction
+    CENTRALITY_REFRESH_GROWTH = 0.1
+
+    def __init__(self, batch_mode: bool = None, max_workers: int = None):
+        """Initialize the discovery processor with AWS clients"""
+        self.max_workers = None
+        self.dependency_map = DependencyGraph()
+        self.reachability_cache = OrderedDict()
+        self.centrality = None
+        self.batch_cache = {}
+        self.archiver = None
+        self.archive_stats = {}
+        self.archive_manifest = None
+        self.change_summary = {}
+        self.delta_summary = {}
+        self.cache_summary = {}
+        self.fetch_failures = {}
+        self.pending_fingerprints = {}
+        self.ip_index = IPIndex()
+        self.compliance_memo = OrderedDict()
+        self.page_size = int(os.environ.get(
+            'DISCOVERY_PAGE_SIZE', self.BATCH_LIMITS['describe_servers']))
+        self.configure(batch_mode, max_workers)
+
+    def configure(self, batch_mode: bool = None, max_workers: int = None):
+        """Apply per-request settings, swapping clients only when concurrency changes"""
+        if batch_mode is None:
+            batch_mode = os.environ.get('DISCOVERY_BATCH_MODE', 'false').lower() == 'true'
+        self.batch_mode = batch_mode
+
+        if max_workers is None:
+            max_workers = int(os.environ.get('DISCOVERY_MAX_WORKERS', '8'))
+        max_workers = max(1, max_workers)
+        if max_workers == self.max_workers:
+            return
+        self.max_workers = max_workers
+
+        # Size the connection pools so concurrent calls don't queue for a connection
+        pool_size = max(10, self.max_workers)
+
+        # Throttled discovery calls are retried by the shared AIMD controller, not botocore
+        self.throttle = AdaptiveThrottle(
+            initial_limit=max(1, self.max_workers // 2),
+            max_limit=self.max_workers,
+            max_retries=int(os.environ.get('DISCOVERY_MAX_RETRIES', '5'))
+        )
+        self.discovery = ThrottledClient(get_aws_client('discovery', pool_size), self.throttle)
+        self.s3 = get_aws_client('s3', pool_size)
+        self.dynamodb = get_aws_resource('dynamodb')
+        self.table = self.dynamodb.Table(os.environ.get('DISCOVERY_TABLE'))
+
+    def collect_advanced_server_data(self, server_id: str = None, incremental: bool = False) -> dict:
+        """Collect comprehensive server data with enhanced metrics"""
+        try:
+            return list(self.stream_server_records(server_id, incremental=incremental))
+        except Exception as e:
+            print(f"Error collecting server data: {str(e)}")
+            return self.get_sample_data()
+
+    def collect_server_results(self, server_ids: List[str], bypass_cache: bool = False) -> List[str]:
+        """Get serialized records for specific servers, reading through the discovery table cache"""
+        results = {} if bypass_cache else self.get_cached_results(server_ids)
+        missing = [server_id for server_id in server_ids if server_id not in results]
+        self.cache_summary = {'hits': len(results), 'misses': len(missing), 'bypassed': bypass_cache}
+
+        if missing:
+            fetched = {
+                record['basic']['serverId']: json.dumps(record)
+                for record in self.stream_server_records(server_ids=missing)
+            }
+            self.cache_results(fetched)
+            results.update(fetched)
+
+        return [results[server_id] for server_id in server_ids if server_id in results]
+
+    def get_cached_results(self, server_ids: List[str]) -> Dict[str, str]:
+        """Get the unexpired cached records for many servers as JSON strings"""
+        now = int(time.time())
+        cached = {}
+        for server_id, item in self.get_table_items(server_ids, self.RESULT_CACHE_KEY).items():
+            if int(item.get('expiresAt', 0)) <= now:
+                continue
+            try:
+                cached[server_id] = gzip.decompress(bytes(item['record'])).decode('utf-8')
+            except Exception as e:
+                print(f"Error reading cached record for {server_id}: {str(e)}")
+        return cached
+
+    def cache_results(self, results: Dict[str, str]):
+        """Cache serialized records in the discovery table until the cache TTL passes"""
+        expires_at = int(time.time()) + self.RESULT_CACHE_TTL
+        items = []
+        for server_id, result in results.items():
+            # Stored compressed as a binary attribute, so floats need no Decimal conversion
+            record = gzip.compress(result.encode('utf-8'))
+            if len(record) > self.RESULT_CACHE_MAX_BYTES:
+                continue
+            items.append({
+                'serverId': server_id,
+                'timestamp': self.RESULT_CACHE_KEY,
+                'record': record,
+                'expiresAt': expires_at
+            })
+        self.put_table_items(items)
+
+    def stream_server_records(self, server_id: str = None, sink=None, incremental: bool = False,
+                              server_ids: List[str] = None, skip_unchanged: bool = False):
+        """Enrich and yield server records one inventory page at a time
+
+        With skip_unchanged, servers whose raw inputs match their last archived fingerprint are
+        not analyzed or yielded; the run manifest points at their earlier archived record.
+        """
+        self.change_summary = {'new': 0, 'changed': 0, 'unchanged': 0}
+        self.delta_summary = {'enriched': 0, 'skipped': 0, 'failed': 0}
+        self.fetch_failures = {}
+        self.pending_fingerprints = {}
+        self.archive_manifest = None
+
+        # Partial runs merge into the persisted fleet graph; full runs rebuild it from scratch
+        self.reset_fleet_indexes(incremental or bool(server_id or server_ids))
+        graph_version = self.dependency_map.version
+
+        # Fleet-wide analyses need every edge and address, so the selection is indexed first
+        selected = self.index_fleet(server_id, server_ids, incremental)
+
+        self.archiver = RawDataArchiver(
+            self.s3,
+            os.environ.get('S3_BUCKET'),
+            chunk_records=int(os.environ.get('RAW_DATA_CHUNK_RECORDS', '500'))
+        )
+        try:
+            for servers in (self.iter_server_pages(server_ids=selected) if selected else []):
+                if self.batch_mode:
+                    self.prefetch_server_batch(
+                        [server['serverId'] for server in servers], self.ENRICH_CALLS
+                    )
+
+                # Raw inputs are compared before any analysis, so unchanged servers can skip it
+                fetched = self.fetch_servers(servers)
+                fingerprints = {
+                    server['serverId']: self.fingerprint_inputs(server, fetched[server['serverId']])
+                    for server in servers
+                }
+                statuses = self.compare_fingerprints(fingerprints)
+                analyzed = [
+                    server for server in servers
+                    if not skip_unchanged or statuses[server['serverId']] != 'unchanged'
+                ]
+
+                records = self.analyze_servers(analyzed, fetched)
+                self.persist_records(records, fingerprints, statuses)
+                self.put_table_items(self.build_sync_marks(servers))
+                self.write_fingerprints(self.archiver.drain_written())
+                self.delta_summary['enriched'] += len(records)
+                for record in records:
+                    if sink:
+                        sink(record)
+                    yield record
+
+                self.batch_cache = {}
+        finally:
+            self.batch_cache = {}
+            archiver, self.archiver = self.archiver, None
+            self.archive_stats = archiver.close()
+            self.archive_manifest = {
+                'bucket': archiver.bucket,
+                'key': archiver.manifest_key,
+                'runId': archiver.run_id,
+                'servers': len(archiver.manifest)
+            } if archiver.manifest_written else None
+
+            # Only records whose chunk was confirmed uploaded are fingerprinted
+            self.write_fingerprints(archiver.drain_written())
+            self.pending_fingerprints = {}
+
+        if self.dependency_map.version != graph_version:
+            self.save_dependency_snapshot()
+
+    def reset_fleet_indexes(self, from_snapshot: bool = False):
+        """Start the run's fleet structures empty or from the snapshot, never from a previous run"""
+        self.dependency_map = DependencyGraph()
+        self.ip_index = IPIndex()
+        self.reachability_cache.clear()
+        self.centrality = None
+        if from_snapshot:
+            self.load_dependency_snapshot()
+
+    def index_fleet(self, server_id: str = None, server_ids: List[str] = None,
+                    incremental: bool = False) -> List[str]:
+        """Map the dependencies and addresses of every selected server, returning their IDs in order"""
+        selected = []
+        for servers in self.iter_server_pages(server_id, server_ids):
+            if incremental:
+                servers = self.select_changed_servers(servers)
+            page_ids = [server['serverId'] for server in servers]
+            if not page_ids:
+                continue
+
+            if self.batch_mode:
+                self.prefetch_server_batch(page_ids, self.INDEX_CALLS)
+            fetched = self._map_concurrent(
+                lambda page_server_id: (self.fetch_direct_dependencies(page_server_id),
+                                        self.fetch_network_info(page_server_id)),
+                page_ids
+            )
+            for page_server_id, (direct_deps, network_info) in zip(page_ids, fetched):
+                if direct_deps is not None:
+                    self.build_dependency_map(page_server_id, direct_deps)
+                self.index_network_interfaces(page_server_id, network_info)
+
+            self.batch_cache = {}
+            selected.extend(page_ids)
+        return selected
+
+    def select_changed_servers(self, servers: List[dict]) -> List[dict]:
+        """Keep servers whose agent data changed since their last successful sync"""
+        high_water_marks = self.get_table_items(
+            [server['serverId'] for server in servers], self.SYNC_KEY
+        )
+        changed = []
+        for server in servers:
+            agent_updated = self._agent_updated_at(server)
+            last_synced = high_water_marks.get(server['serverId'], {}).get('agentLastUpdated')
+            if agent_updated and last_synced and agent_updated <= self._parse_timestamp(last_synced):
+                self.delta_summary['skipped'] += 1
+            else:
+                changed.append(server)
+        return changed
+
+    def build_sync_marks(self, servers: List[dict]) -> List[dict]:
+        """Build the high-water mark items recording a successful sync of each server"""
+        synced_at = datetime.utcnow().isoformat()
+        sync_marks = []
+        for server in servers:
+            # Servers with a failed fetch stay unsynced so the next incremental run retries them
+            if server['serverId'] in self.fetch_failures:
+                self.delta_summary['failed'] += 1
+                continue
+
+            agent_updated = self._agent_updated_at(server)
+            if agent_updated:
+                sync_marks.append({
+                    'serverId': server['serverId'],
+                    'timestamp': self.SYNC_KEY,
+                    'agentLastUpdated': agent_updated.isoformat(),
+                    'syncedAt': synced_at
+                })
+        return sync_marks
+
+    def _agent_updated_at(self, server: dict) -> datetime:
+        """Get when the server's agent data last changed, as naive UTC"""
+        for field in self.AGENT_UPDATED_FIELDS:
+            if server.get(field):
+                try:
+                    return self._parse_timestamp(server[field])
+                except (TypeError, ValueError) as e:
+                    print(f"Error parsing {field} for {server['serverId']}: {str(e)}")
+        return None
+
+    def _parse_timestamp(self, value) -> datetime:
+        if isinstance(value, datetime):
+            timestamp = value
+        elif isinstance(value, str):
+            timestamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        else:
+            return datetime.utcfromtimestamp(float(value))
+
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        return timestamp
+
+    def load_dependency_snapshot(self):
+        """Load the persisted dependency graph and IP index so deltas merge into the full fleet"""
+        try:
+            response = self.s3.get_object(
+                Bucket=os.environ.get('S3_BUCKET'),
+                Key=self.GRAPH_SNAPSHOT_KEY
+            )
+            snapshot = json.loads(gzip.decompress(response['Body'].read()))
+            self.dependency_map = DependencyGraph.from_snapshot(snapshot)
+            self.ip_index = IPIndex.from_snapshot(snapshot.get('ipIndex', {}))
+            self.reachability_cache.clear()
+            self.centrality = None
+        except Exception as e:
+            print(f"Error loading dependency graph snapshot: {str(e)}")
+
+    def save_dependency_snapshot(self):
+        """Persist the dependency graph and IP index for later incremental runs"""
+        snapshot = self.dependency_map.to_snapshot()
+        snapshot['ipIndex'] = self.ip_index.to_snapshot()
+        try:
+            self.s3.put_object(
+                Bucket=os.environ.get('S3_BUCKET'),
+                Key=self.GRAPH_SNAPSHOT_KEY,
+                Body=gzip.compress(json.dumps(snapshot).encode('utf-8')),
+                ContentType='application/json',
+                ContentEncoding='gzip'
+            )
+        except Exception as e:
+            print(f"Error saving dependency graph snapshot: {str(e)}")
+
+    def compare_fingerprints(self, fingerprints: Dict[str, str]) -> Dict[str, str]:
+        """Classify servers as new, changed or unchanged against their last archived fingerprints"""
+        stored = self.get_table_items(list(fingerprints), self.FINGERPRINT_KEY)
+        statuses = {}
+        for server_id, fingerprint in fingerprints.items():
+            item = stored.get(server_id, {})
+            location = item.get('archive')
+            if not item.get('fingerprint'):
+                status = 'new'
+            elif (item['fingerprint'] == fingerprint and location
+                    and server_id not in self.fetch_failures):
+                status = 'unchanged'
+                self.archiver.reference(server_id, {
+                    field: int(location[field]) if field in ('offset', 'length') else location.get(field)
+                    for field in self.ARCHIVE_LOCATION_FIELDS
+                })
+            else:
+                status = 'changed'
+
+            statuses[server_id] = status
+            self.change_summary[status] += 1
+        return statuses
+
+    def persist_records(self, records: List[dict], fingerprints: Dict[str, str],
+                        statuses: Dict[str, str]):
+        """Archive new or changed records, holding their fingerprints until the upload is confirmed"""
+        for record in records:
+            server_id = record['basic']['serverId']
+            status = statuses[server_id]
+            if status != 'unchanged':
+                self.store_raw_data(record)
+
+                # A record built from failed fetches isn't fingerprinted, so it is compared afresh next run
+                if server_id not in self.fetch_failures:
+                    self.pending_fingerprints[server_id] = (fingerprints[server_id], record['lastUpdated'])
+
+            # Downstream consumers can skip records that haven't changed
+            record['changeStatus'] = status
+
+    def write_fingerprints(self, written: Dict[str, dict]):
+        """Store the fingerprints of records whose archive chunk was uploaded"""
+        items = []
+        for server_id, location in written.items():
+            pending = self.pending_fingerprints.pop(server_id, None)
+            if pending is None:
+                continue
+            items.append({
+                'serverId': server_id,
+                'timestamp': self.FINGERPRINT_KEY,
+                'fingerprint': pending[0],
+                'updatedAt': pending[1],
+                'archive': {field: location.get(field) for field in self.ARCHIVE_LOCATION_FIELDS}
+            })
+        self.put_table_items(items)
+
+    def fingerprint_inputs(self, server: dict, fetched: dict) -> str:
+        """Hash a server's raw discovery inputs, leaving out fleet-level and per-run values"""
+        inputs = {
+            'server': {
+                key: value for key, value in server.items() if key not in self.AGENT_UPDATED_FIELDS
+            },
+            'dependencies': self.analyze_mapped_dependencies(server['serverId']),
+            **fetched
+        }
+        return hashlib.sha256(
+            json.dumps(inputs, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+        ).hexdigest()
+
+    def get_table_items(self, server_ids: List[str], sort_key: str) -> Dict[str, dict]:
+        """Batch-read the discovery table items with a given sort key for many servers"""
+        items = {}
+        table_name = self.table.name
+        for start in range(0, len(server_ids), self.DYNAMODB_BATCH_GET_LIMIT):
+            request = {table_name: {'Keys': [
+                {'serverId': server_id, 'timestamp': sort_key}
+                for server_id in server_ids[start:start + self.DYNAMODB_BATCH_GET_LIMIT]
+            ]}}
+            attempt = 0
+            try:
+                while request:
+                    response = self.dynamodb.batch_get_item(RequestItems=request)
+                    for item in response.get('Responses', {}).get(table_name, []):
+                        items[item['serverId']] = item
+
+                    request = response.get('UnprocessedKeys')
+                    if request:
+                        if attempt >= self.throttle.max_retries:
+                            print(f"Giving up on {len(request[table_name]['Keys'])} unprocessed keys")
+                            break
+                        time.sleep(self.throttle.backoff_delay(attempt))
+                        attempt += 1
+            except Exception as e:
+                print(f"Error reading discovery table: {str(e)}")
+        return items
+
+    def put_table_items(self, items: List[dict]):
+        """Batch-write items to the discovery table"""
+        if not items:
+            return
+        try:
+            # batch_writer groups puts into BatchWriteItem calls and resends unprocessed items
+            with self.table.batch_writer(overwrite_by_pkeys=['serverId', 'timestamp']) as writer:
+                for item in items:
+                    writer.put_item(Item=item)
+        except Exception as e:
+            print(f"Error writing discovery table: {str(e)}")
+
+    def iter_server_pages(self, server_id: str = None, server_ids: List[str] = None):
+        """Page lazily through the discovered server inventory, or just the given servers"""
+        if server_id:
+            server_ids = [server_id]
+        if server_ids:
+            limit = self.BATCH_LIMITS['describe_servers']
+            for start in range(0, len(server_ids), limit):
+                yield self.discovery.describe_servers(
+                    serverIds=server_ids[start:start + limit]
+                )['servers']
+            return
+
+        request = {'maxResults': self.page_size}
+        while True:
+            response = self.discovery.describe_servers(**request)
+            if response.get('servers'):
+                yield response['servers']
+
+            if not response.get('nextToken'):
+                break
+            request['nextToken'] = response['nextToken']
+
+    def enrich_servers(self, servers: List[dict]) -> List[dict]:
+        """Enrich servers concurrently, returning records in input order"""
+        return self.analyze_servers(servers, self.fetch_servers(servers))
+
+    def fetch_servers(self, servers: List[dict]) -> Dict[str, dict]:
+        """Fetch the raw discovery data of many servers concurrently, keyed by server ID"""
+        fetchers = {
+            'details': self.get_detailed_server_info,
+            'metrics': self.fetch_utilization_metrics,
+            'applications': self.get_application_details,
+            'network': self.fetch_network_info
+        }
+
+        # Every independent call of every server is a separate task
+        tasks = [(server['serverId'], name) for server in servers for name in fetchers]
+        results = self._map_concurrent(lambda task: fetchers[task[1]](task[0]), tasks)
+
+        fetched = {}
+        for (server_id, name), result in zip(tasks, results):
+            fetched.setdefault(server_id, {})[name] = result
+        return fetched
+
+    def analyze_servers(self, servers: List[dict], fetched: Dict[str, dict]) -> List[dict]:
+        """Build the records of fetched servers, analyzing the whole page together"""
+        if not servers:
+            return []
+
+        # Metric trends for the whole page are analyzed together from the raw histories
+        raw_metrics = [fetched[server['serverId']]['metrics'] for server in servers]
+        for server, metrics, trends in zip(servers, raw_metrics, self.analyze_fleet_trends(raw_metrics)):
+            fetched[server['serverId']]['metrics'] = (
+                self.format_performance_metrics(metrics, trends) if metrics is not None else {}
+            )
 
-class EnhancedDiscoveryProcessor:
-    def __init__(self):
-        """Initialize the discovery processor with AWS clients"""
-        self.discovery = boto3.client('discovery')
-        self.s3 = boto3.client('s3')
-        self.dynamodb = boto3.resource('dynamodb')
-        self.table = self.dynamodb.Table(os.environ.get('DISCOVERY_TABLE'))
-        self.dependency_map = {}
-        
-    def collect_advanced_server_data(self, server_id: str = None) -> dict:
-        """Collect comprehensive server data with enhanced metrics"""
-        try:
-            # Get list of discovered servers
-            if server_id:
-                servers = self.discovery.describe_servers(serverIds=[server_id])
-            else:
-                servers = self.discovery.describe_servers()
-            
-            collected_data = []
-            for server in servers['servers']:
-                # Get detailed metrics and information
-                server_details = self.get_detailed_server_info(server['serverId'])
-                performance_metrics = self.get_performance_metrics(server['serverId'])
-                dependencies = self.get_comprehensive_dependencies(server['serverId'])
-                security_info = self.get_security_info(server['serverId'])
-                
-                server_data = {
-                    'basic': {
-                        'serverId': server['serverId'],
-                        'serverName': server.get('serverName', ''),
-                        'serverType': server.get('serverType', ''),
-                        'osInfo': {
-                            'name': server.get('osName', ''),
-                            'version': server.get('osVersion', ''),
-                            'kernel': server_details.get('kernelVersion', ''),
-                            'architecture': server_details.get('architecture', '')
-                        }
-                    },
-                    'metrics': performance_metrics,
-                    'applications': self.get_application_details(server['serverId']),
-                    'dependencies': dependencies,
-                    'network': self.get_network_topology(server['serverId']),
-                    'security': security_info,
-                    'compliance': self.assess_compliance(server_details),
-                    'lastUpdated': datetime.utcnow().isoformat()
+        # Traffic is profiled and anomalies detected across every interface of the page at once
+        raw_network = [fetched[server['serverId']]['network'] for server in servers]
+        aggregators, anomalies = self.profile_fleet_traffic(raw_network)
+
+        # Connections resolve against the IP index the indexing pass built for the whole fleet
+        for server, network_info, server_anomalies, server_aggregators in zip(
+                servers, raw_network, anomalies, aggregators):
+            fetched[server['serverId']]['network'] = (
+                self.format_network_topology(
+                    network_info, server_anomalies, aggregators=server_aggregators
+                ) if network_info is not None else {}
+            )
+
+        records = [
+            self.build_server_record(server, fetched[server['serverId']])
+            for server in servers
+        ]
+
+        # Compliance is evaluated rule by rule across the whole page
+        for record, compliance in zip(records, self.evaluate_compliance(records)):
+            record['compliance'] = compliance
+        return records
+
+    def build_server_record(self, server: dict, fetched: dict) -> dict:
+        """Assemble the discovery record for a server from its fetched data"""
+        server_details = fetched['details']
+
+        # Vulnerabilities are matched from the already fetched application list
+        security = self.get_security_info(server['serverId'], fetched['applications'])
+
+        return {
+            'basic': {
+                'serverId': server['serverId'],
+                'serverName': server.get('serverName', ''),
+                'serverType': server.get('serverType', ''),
+                'osInfo': {
+                    'name': server.get('osName', ''),
+                    'version': server.get('osVersion', ''),
+                    'kernel': server_details.get('kernelVersion', ''),
+                    'architecture': server_details.get('architecture', ''),
+                    'lastPatched': server_details.get('lastPatchedDate'),
+                    'lifecycle': get_os_lifecycle_catalog().verdict(
+                        server.get('osName', ''), server.get('osVersion', ''), self.OS_EOL_WARNING_DAYS
+                    )
                 }
-                
-                # Store raw data in S3
-                self.store_raw_data(server_data)
-                collected_data.append(server_data)
-            
-            return collected_data
-            
+            },
+            'metrics': fetched['metrics'],
+            'applications': fetched['applications'],
+            'dependencies': (self.analyze_dependencies(server['serverId'], fetched.get('dependencies'))
+                             if server['serverId'] in self.dependency_map else {}),
+            'network': fetched['network'],
+            'security': security,
+            'compliance': {},
+            'lastUpdated': datetime.utcnow().isoformat()
+        }
+
+    def _map_concurrent(self, func, items: list) -> list:
+        """Apply func to items on a bounded thread pool, preserving input order"""
+        if self.max_workers <= 1 or len(items) <= 1:
+            return [func(item) for item in items]
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as pool:
+            return list(pool.map(func, items))
+
+    def prefetch_server_batch(self, server_ids: List[str], methods: tuple = None):
+        """Fetch per-server Discovery data for many servers using batched calls"""
+        tasks = []
+        for method, result_key, key_field in self.BATCHED_CALLS:
+            if methods is not None and method not in methods:
+                continue
+            batch_size = self.BATCH_LIMITS.get(method, 1)
+            for start in range(0, len(server_ids), batch_size):
+                tasks.append((method, result_key, key_field, server_ids[start:start + batch_size]))
+
+        responses = self._map_concurrent(self._fetch_chunk, tasks)
+
+        self.batch_cache = {result_key: {} for _, result_key, _ in self.BATCHED_CALLS}
+        for (method, result_key, key_field, chunk), response in zip(tasks, responses):
+            # Servers left out of the cache fall back to individual calls
+            if response is None:
+                continue
+
+            grouped = {chunk_server_id: [] for chunk_server_id in chunk}
+            unowned = 0
+            for item in response.get(result_key, []):
+                owner = item.get(key_field) or (chunk[0] if len(chunk) == 1 else None)
+                if owner in grouped:
+                    grouped[owner].append(item)
+                elif owner is None:
+                    unowned += 1
+
+            # Unowned items may belong to any server that got none, so those fall back too
+            if unowned:
+                print(f"Batched {method} returned {unowned} items without {key_field}; "
+                      f"falling back to individual calls for servers without results")
+                grouped = {owner: items for owner, items in grouped.items() if items}
+            self.batch_cache[result_key].update(grouped)
+
+    def _fetch_chunk(self, task: tuple) -> dict:
+        """Call a batched Discovery API for one chunk of server IDs"""
+        method, _, _, chunk = task
+        try:
+            return getattr(self.discovery, method)(serverIds=chunk)
         except Exception as e:
-            print(f"Error collecting server data: {str(e)}")
-            return self.get_sample_data()
+            print(f"Error in batched {method}: {str(e)}")
+            return None
+
+    def _discovery_items(self, method: str, result_key: str, server_id: str) -> List[dict]:
+        """Get Discovery items for a server, from the batch cache when prefetched"""
+        items = self.batch_cache.get(result_key, {}).get(server_id)
+        if items is None:
+            items = getattr(self.discovery, method)(serverIds=[server_id])[result_key]
+        return items
+
+    def record_fetch_failure(self, server_id: str, fetch: str, error: Exception):
+        """Log a failed fetch and remember it, so the server's data isn't treated as complete"""
+        print(f"Error fetching {fetch} for {server_id}: {str(error)}")
+        self.fetch_failures.setdefault(server_id, set()).add(fetch)
 
     def get_detailed_server_info(self, server_id: str) -> dict:
         """Get detailed server information"""
         try:
-            response = self.discovery.describe_server_information(serverIds=[server_id])
-            server_info = response['serverInfo'][0]
+            server_info = self._discovery_items(
+                'describe_server_information', 'serverInfo', server_id
+            )[0]
             
             return {
                 'cpuModel': server_info.get('serverModel', ''),
@@ -73,76 +2279,83 @@ class EnhancedDiscoveryProcessor:
                 'numCores': server_info.get('numCores', 0),
                 'numSockets': server_info.get('numSockets', 0),
                 'ramBytes': server_info.get('ramBytes', 0),
-                'diskBytes': server_info.get('diskBytes', 0)
+                'diskBytes': server_info.get('diskBytes', 0),
+                'lastPatchedDate': server_info.get('lastPatchedDate')
             }
         except Exception as e:
-            print(f"Error getting server info: {str(e)}")
+            self.record_fetch_failure(server_id, 'details', e)
             return {}
 
     def get_performance_metrics(self, server_id: str) -> dict:
         """Get detailed performance metrics"""
-        try:
-            metrics = self.discovery.get_server_utilization_metrics(
-                serverIds=[server_id]
-            )['utilizationMetrics'][0]
-            
-            return {
-                'cpu': {
-                    'cores': metrics.get('numCores', 0),
-                    'utilization': metrics.get('cpuUtilization', 0),
-                    'trend': self.analyze_metric_trend('cpu', metrics)
-                },
-                'memory': {
-                    'total': metrics.get('ramBytes', 0),
-                    'used': metrics.get('ramBytesUsed', 0),
-                    'utilization': metrics.get('ramUtilization', 0),
-                    'trend': self.analyze_metric_trend('memory', metrics)
-                },
-                'storage': {
-                    'total': metrics.get('diskBytes', 0),
-                    'used': metrics.get('diskBytesUsed', 0),
-                    'utilization': metrics.get('diskUtilization', 0),
-                    'trend': self.analyze_metric_trend('storage', metrics)
-                },
-                'network': {
-                    'bytesIn': metrics.get('networkBytesIn', 0),
-                    'bytesOut': metrics.get('networkBytesOut', 0),
-                    'trend': self.analyze_metric_trend('network', metrics)
-                }
-            }
-        except Exception as e:
-            print(f"Error getting performance metrics: {str(e)}")
+        metrics = self.fetch_utilization_metrics(server_id)
+        if metrics is None:
             return {}
+        return self.format_performance_metrics(metrics, self.analyze_fleet_trends([metrics])[0])
 
-    def analyze_metric_trend(self, metric_type: str, metrics: dict) -> dict:
-        """Analyze metric trends"""
+    def fetch_utilization_metrics(self, server_id: str) -> dict:
+        """Get the raw utilization metrics of a server"""
         try:
-            current_value = metrics.get(f'{metric_type}Utilization', 0)
-            previous_values = metrics.get(f'{metric_type}UtilizationHistory', [])
-            
-            if not previous_values:
-                return {'trend': 'stable', 'growth_rate': 0}
+            return self._discovery_items(
+                'get_server_utilization_metrics', 'utilizationMetrics', server_id
+            )[0]
+        except Exception as e:
+            self.record_fetch_failure(server_id, 'metrics', e)
+            return None
 
-            avg = sum(previous_values) / len(previous_values)
-            growth_rate = ((current_value - previous_values[0]) / previous_values[0] * 100 
-                         if previous_values[0] != 0 else 0)
-            
-            trend = 'increasing' if growth_rate > 10 else 'decreasing' if growth_rate < -10 else 'stable'
-            
-            return {
-                'trend': trend,
-                'growth_rate': round(growth_rate, 2),
-                'average': round(avg, 2),
-                'peak': max(previous_values + [current_value])
+    def format_performance_metrics(self, metrics: dict, trends: dict) -> dict:
+        """Shape raw utilization metrics and their analyzed trends into the record format"""
+        return {
+            'cpu': {
+                'cores': metrics.get('numCores', 0),
+                'utilization': metrics.get('cpuUtilization', 0),
+                'trend': trends['cpu']
+            },
+            'memory': {
+                'total': metrics.get('ramBytes', 0),
+                'used': metrics.get('ramBytesUsed', 0),
+                'utilization': metrics.get('ramUtilization', 0),
+                'trend': trends['memory']
+            },
+            'storage': {
+                'total': metrics.get('diskBytes', 0),
+                'used': metrics.get('diskBytesUsed', 0),
+                'utilization': metrics.get('diskUtilization', 0),
+                'trend': trends['storage']
+            },
+            'network': {
+                'bytesIn': metrics.get('networkBytesIn', 0),
+                'bytesOut': metrics.get('networkBytesOut', 0),
+                'trend': trends['network']
             }
-        except Exception as e:
-            print(f"Error analyzing metric trend: {str(e)}")
-            return {'trend': 'unknown', 'growth_rate': 0}
+        }
+
+    def analyze_fleet_trends(self, fleet_metrics: List[dict]) -> List[dict]:
+        """Analyze the utilization trends of many servers at once, by metric type"""
+        engine = MetricTrendEngine()
+        for index, metrics in enumerate(fleet_metrics):
+            for metric_type in self.TREND_METRICS:
+                if metrics is not None:
+                    engine.add(
+                        (index, metric_type),
+                        metrics.get(f'{metric_type}Utilization', 0),
+                        metrics.get(f'{metric_type}UtilizationHistory') or []
+                    )
+
+        trends = [
+            {metric_type: {'trend': 'unknown', 'growth_rate': 0} for metric_type in self.TREND_METRICS}
+            for _ in fleet_metrics
+        ]
+        for (index, metric_type), trend in zip(engine.keys, engine.analyze()):
+            trends[index][metric_type] = trend
+        return trends
 
     def get_application_details(self, server_id: str) -> List[dict]:
         """Get detailed application information"""
         try:
-            apps = self.discovery.list_server_applications(serverIds=[server_id])
+            apps = self._discovery_items(
+                'list_server_applications', 'applications', server_id
+            )
             
             return [{
                 'name': app['name'],
@@ -150,26 +2363,41 @@ class EnhancedDiscoveryProcessor:
                 'path': app.get('path', ''),
                 'type': app.get('type', 'unknown'),
                 'status': app.get('status', 'unknown')
-            } for app in apps['applications']]
+            } for app in apps]
         except Exception as e:
-            print(f"Error getting application details: {str(e)}")
+            self.record_fetch_failure(server_id, 'applications', e)
             return []
 
     def get_comprehensive_dependencies(self, server_id: str) -> dict:
         """Get comprehensive dependency mapping"""
+        direct_deps = self.fetch_direct_dependencies(server_id)
+        if direct_deps is None:
+            return {}
+
+        self.build_dependency_map(server_id, direct_deps)
+        return self.analyze_dependencies(server_id, direct_deps)
+
+    def fetch_direct_dependencies(self, server_id: str) -> List[dict]:
+        """Fetch the direct dependencies reported for a server"""
+        try:
+            return self._discovery_items(
+                'describe_server_dependencies', 'dependencies', server_id
+            )
+        except Exception as e:
+            self.record_fetch_failure(server_id, 'dependencies', e)
+            return None
+
+    def analyze_dependencies(self, server_id: str, direct_deps: List[dict] = None) -> dict:
+        """Analyze a server's dependencies, by default as already mapped, against the dependency map"""
         try:
-            direct_deps = self.discovery.describe_server_dependencies(
-                serverIds=[server_id]
-            )['dependencies']
-            
-            self.build_dependency_map(server_id, direct_deps)
-            
             return {
-                'direct': self.analyze_direct_dependencies(direct_deps),
+                'direct': (self.analyze_direct_dependencies(direct_deps) if direct_deps is not None
+                           else self.analyze_mapped_dependencies(server_id)),
                 'indirect': self.analyze_indirect_dependencies(server_id),
                 'services': self.map_service_dependencies(server_id),
                 'critical_path': self.find_critical_path(server_id),
-                'risk_assessment': self.assess_dependency_risks(server_id)
+                'risk_assessment': self.assess_dependency_risks(server_id),
+                'centrality': self.get_centrality(server_id)
             }
         except Exception as e:
             print(f"Error mapping dependencies: {str(e)}")
@@ -177,21 +2405,14 @@ class EnhancedDiscoveryProcessor:
 
     def build_dependency_map(self, server_id: str, dependencies: List[dict]):
         """Build dependency map"""
-        if server_id not in self.dependency_map:
-            self.dependency_map[server_id] = {
-                'direct_deps': set(),
-                'attributes': {}
-            }
-        
-        for dep in dependencies:
-            dest_id = dep['destinationServerId']
-            self.dependency_map[server_id]['direct_deps'].add(dest_id)
-            self.dependency_map[server_id]['attributes'][dest_id] = {
-                'type': dep.get('dependencyType', 'unknown'),
-                'strength': self.calculate_dependency_strength(dep),
-                'latency': dep.get('averageLatency', 0),
-                'throughput': dep.get('averageThroughput', 0)
-            }
+        # A server's latest report supersedes the dependencies it reported before
+        self.dependency_map.add_edges(server_id, [(
+            dep['destinationServerId'],
+            dep.get('dependencyType', 'unknown'),
+            self.calculate_dependency_strength(dep),
+            dep.get('averageLatency', 0),
+            dep.get('averageThroughput', 0)
+        ) for dep in dependencies], replace=True)
 
     def analyze_direct_dependencies(self, dependencies: List[dict]) -> List[dict]:
         """Analyze direct dependencies"""
@@ -205,51 +2426,284 @@ class EnhancedDiscoveryProcessor:
             }
         } for dep in dependencies]
 
+    def analyze_mapped_dependencies(self, server_id: str) -> List[dict]:
+        """Analyze a server's direct dependencies from its edges in the dependency map"""
+        graph = self.dependency_map
+        node = graph.node(server_id)
+        if node is None:
+            return []
+        return [{
+            'serverId': graph.node_ids[graph.targets[position]],
+            'type': graph.type_names[graph.types[position]],
+            'strength': graph.strengths[position],
+            'metrics': {
+                'latency': graph.latencies[position],
+                'throughput': graph.throughputs[position]
+            }
+        } for position in graph.edge_range(node)]
+
     def analyze_indirect_dependencies(self, server_id: str) -> List[dict]:
         """Analyze indirect dependencies"""
-        indirect_deps = []
-        visited = {server_id}
-        
-        def find_indirect_deps(current_id: str, depth: int = 0):
-            if depth > 10 or current_id not in self.dependency_map:
-                return
-                
-            for dep_id in self.dependency_map[current_id]['direct_deps']:
-                if dep_id not in visited:
-                    visited.add(dep_id)
-                    paths = self.find_all_paths(server_id, dep_id)
-                    if paths:
-                        indirect_deps.append({
-                            'serverId': dep_id,
-                            'path': paths[0],
-                            'depth': depth + 1,
-                            'impact': self.assess_dependency_impact(dep_id)
-                        })
-                    find_indirect_deps(dep_id, depth + 1)
-                    
-        find_indirect_deps(server_id)
-        return indirect_deps
-
-    def find_all_paths(self, start: str, end: str, visited: Set[str] = None) -> List[List[str]]:
-        """Find all dependency paths"""
-        if visited is None:
-            visited = set()
-            
-        if start not in self.dependency_map:
+        reachability = self.get_reachability(server_id)
+        node_ids = self.dependency_map.node_ids
+        return [{
+            'serverId': node_ids[dep],
+            'path': self._trace_path(reachability['parents'], dep),
+            'depth': reachability['depths'][dep],
+            'impact': self.assess_dependency_impact(node_ids[dep])
+        } for dep in reachability['order']]
+
+    def get_reachability(self, source_id: str) -> dict:
+        """Get BFS parent pointers and depths from a server, cached per graph version"""
+        graph = self.dependency_map
+        cached = self.reachability_cache.get(source_id)
+        if cached and cached[0] == graph.version:
+            self.reachability_cache.move_to_end(source_id)
+            return cached[1]
+
+        parents = {}
+        depths = {}
+        order = []
+        source = graph.node(source_id)
+        if source is not None:
+            graph.compile()
+            offsets, targets, reported = graph.offsets, graph.targets, graph.reported
+            visited = bytearray(len(graph))
+            visited[source] = 1
+            parents[source] = -1
+            depths[source] = 0
+            queue = deque([source])
+            while queue:
+                current = queue.popleft()
+                if depths[current] >= self.MAX_DEPENDENCY_DEPTH or not reported[current]:
+                    continue
+
+                for position in range(offsets[current], offsets[current + 1]):
+                    dep = targets[position]
+                    if not visited[dep]:
+                        visited[dep] = 1
+                        parents[dep] = current
+                        depths[dep] = depths[current] + 1
+                        order.append(dep)
+                        queue.append(dep)
+
+        reachability = {'parents': parents, 'depths': depths, 'order': order}
+        self.reachability_cache[source_id] = (graph.version, reachability)
+        if len(self.reachability_cache) > self.REACHABILITY_CACHE_SIZE:
+            self.reachability_cache.popitem(last=False)
+        return reachability
+
+    def find_dependency_path(self, start: str, end: str) -> List[str]:
+        """Find the shortest dependency path between two servers"""
+        parents = self.get_reachability(start)['parents']
+        end_node = self.dependency_map.node(end)
+        if end_node not in parents:
             return []
-            
-        if start == end:
-            return [[start]]
-            
-        paths = []
-        visited.add(start)
-        
-        for next_server in self.dependency_map[start]['direct_deps']:
-            if next_server not in visited:
-                for path in self.find_all_paths(next_server, end, visited.copy()):
-                    paths.append([start] + path)
-                    
-        return paths
+        return self._trace_path(parents, end_node)
+
+    def _trace_path(self, parents: Dict[int, int], end: int) -> List[str]:
+        path = []
+        while end != -1:
+            path.append(self.dependency_map.node_ids[end])
+            end = parents[end]
+        return path[::-1]
+
+    def map_service_dependencies(self, server_id: str) -> dict:
+        """Map a server to its application group and dependency fan-in/fan-out"""
+        node = self.dependency_map.node(server_id)
+        if node is None:
+            return {}
+
+        topology = self.dependency_map.cached('topology', self._compute_fleet_topology)
+        group = topology['group'][node]
+        return {
+            'application_group': f'group-{group + 1}',
+            'group_size': topology['group_sizes'][group],
+            'fan_in': topology['fan_in'][node],
+            'fan_out': topology['fan_out'][node]
+        }
+
+    def assess_dependency_risks(self, server_id: str) -> dict:
+        """Assess single-point-of-failure and concentration risks for a server"""
+        node = self.dependency_map.node(server_id)
+        if node is None:
+            return {}
+
+        topology = self.dependency_map.cached('topology', self._compute_fleet_topology)
+        single_point_of_failure = bool(topology['articulation'][node])
+        bridges = [
+            self.dependency_map.node_ids[neighbour]
+            for neighbour in topology['bridges'].get(node, [])
+        ]
+
+        score = min(1.0, topology['fan_in'][node] / 10) * 0.3
+        if single_point_of_failure:
+            score += 0.5
+        if bridges:
+            score += 0.2
+
+        return {
+            'single_point_of_failure': single_point_of_failure,
+            'bridges': bridges,
+            'score': round(score, 2),
+            'level': 'high' if score >= 0.6 else 'medium' if score >= 0.3 else 'low'
+        }
+
+    def _compute_fleet_topology(self) -> dict:
+        """Compute groups, degrees and cut points for the whole fleet in one pass"""
+        graph = self.dependency_map
+        group, group_sizes = graph.weakly_connected_components()
+        fan_in, fan_out = graph.degrees()
+        articulation, bridge_edges = graph.cut_points()
+
+        bridges = {}
+        for node_a, node_b in bridge_edges:
+            bridges.setdefault(node_a, []).append(node_b)
+            bridges.setdefault(node_b, []).append(node_a)
+
+        return {
+            'group': group,
+            'group_sizes': group_sizes,
+            'fan_in': fan_in,
+            'fan_out': fan_out,
+            'articulation': articulation,
+            'bridges': bridges
+        }
+
+    def get_centrality(self, server_id: str) -> float:
+        """Get a server's approximate betweenness centrality across the fleet"""
+        graph = self.dependency_map
+        graph.compile()
+        edge_count = len(graph.targets)
+        if self.centrality is None or edge_count > self.centrality['edges'] * (1 + self.CENTRALITY_REFRESH_GROWTH):
+            self.centrality = {'edges': edge_count, 'scores': self.compute_hub_centrality()}
+
+        node = graph.node(server_id)
+        scores = self.centrality['scores']
+        if scores is None or node is None or node >= len(scores):
+            return None
+        return round(scores[node], 6)
+
+    def compute_hub_centrality(self) -> array:
+        """Estimate betweenness centrality from sampled pivots split across worker processes"""
+        if not networkx.is_available():
+            print("networkx is not available, skipping hub detection")
+            return None
+
+        graph = self.dependency_map
+        node_count = len(graph)
+        if node_count < 3:
+            return array('d', [0.0]) * node_count
+
+        nx_graph = networkx.DiGraph()
+        nx_graph.add_nodes_from(range(node_count))
+        nx_graph.add_edges_from(
+            (source, graph.targets[position])
+            for source in range(node_count)
+            for position in graph.edge_range(source)
+        )
+
+        pivots = random.Random(node_count).sample(range(node_count), min(self.CENTRALITY_SAMPLES, node_count))
+        deadline = time.monotonic() + self.CENTRALITY_TIME_BUDGET
+        totals, processed = self._run_betweenness_workers(nx_graph, pivots, deadline)
+        if not processed:
+            return None
+
+        # Extrapolate from the pivots that finished, then normalize as networkx does for digraphs
+        scale = (node_count / processed) / ((node_count - 1) * (node_count - 2))
+        scores = array('d', [0.0]) * node_count
+        for node, value in totals.items():
+            scores[node] = value * scale
+        return scores
+
+    def _run_betweenness_workers(self, nx_graph, pivots: List[int], deadline: float) -> tuple:
+        """Run betweenness workers in forked processes, merging whatever finishes in time"""
+        workers = min(self.CENTRALITY_WORKERS, len(pivots))
+        if workers <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+            return _betweenness_worker(None, nx_graph, pivots, deadline)
+
+        # Lambda has no /dev/shm, so results come back over pipes rather than queues or pools
+        context = multiprocessing.get_context('fork')
+        running = []
+        for worker in range(workers):
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(
+                target=_betweenness_worker,
+                args=(sender, nx_graph, pivots[worker::workers], deadline)
+            )
+            process.start()
+            sender.close()
+            running.append((process, receiver))
+
+        totals = {}
+        processed = 0
+        for process, receiver in running:
+            try:
+                # Allow for the pivot in progress when the deadline passes
+                if receiver.poll(max(0.0, deadline - time.monotonic()) + self.CENTRALITY_TIME_BUDGET):
+                    worker_totals, worker_processed = receiver.recv()
+                    for node, value in worker_totals.items():
+                        totals[node] = totals.get(node, 0.0) + value
+                    processed += worker_processed
+            except (EOFError, OSError) as e:
+                print(f"Error in centrality worker: {str(e)}")
+            finally:
+                receiver.close()
+                process.join(timeout=0.1)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+
+        return totals, processed
+
+    def find_critical_path(self, server_id: str) -> List[str]:
+        """Find the heaviest dependency chain starting at a server"""
+        graph = self.dependency_map
+        node = graph.node(server_id)
+        if node is None:
+            return []
+
+        component, best_source, best_edge = graph.cached(
+            f'critical_path:{self.CRITICAL_PATH_WEIGHT}', self._compute_critical_paths
+        )[:3]
+
+        path = [node]
+        current = component[node]
+        while best_edge[current] != -1:
+            if best_source[current] != path[-1]:
+                path.append(best_source[current])
+            path.append(graph.targets[best_edge[current]])
+            current = component[path[-1]]
+        return [graph.node_ids[member] for member in path]
+
+    def _compute_critical_paths(self) -> tuple:
+        """Longest weighted path out of every SCC of the condensed dependency graph"""
+        graph = self.dependency_map
+        weights = graph.latencies if self.CRITICAL_PATH_WEIGHT == 'latency' else graph.strengths
+        component, component_count = graph.strongly_connected_components()
+
+        # Group nodes by component; Tarjan numbers sinks first, so successors are final
+        members = [[] for _ in range(component_count)]
+        for node in range(len(graph)):
+            members[component[node]].append(node)
+
+        distance = array('d', [0.0]) * component_count
+        best_source = array('l', [-1]) * component_count
+        best_edge = array('l', [-1]) * component_count
+        offsets, targets = graph.offsets, graph.targets
+        for current in range(component_count):
+            for node in members[current]:
+                for position in range(offsets[node], offsets[node + 1]):
+                    dep_component = component[targets[position]]
+                    if dep_component == current:
+                        continue
+                    length = weights[position] + distance[dep_component]
+                    if best_edge[current] == -1 or length > distance[current]:
+                        distance[current] = length
+                        best_source[current] = node
+                        best_edge[current] = position
+
+        return component, best_source, best_edge, distance
 
     def calculate_dependency_strength(self, dependency: dict) -> float:
         """Calculate dependency strength"""
@@ -295,7 +2749,7 @@ class EnhancedDiscoveryProcessor:
         if server_id not in self.dependency_map:
             return 0.0
         
-        direct_deps = len(self.dependency_map[server_id]['direct_deps'])
+        direct_deps = self.dependency_map.out_degree(self.dependency_map.node(server_id))
         return min(1.0, direct_deps * 0.1)
 
     def calculate_performance_impact(self, server_id: str) -> float:
@@ -303,46 +2757,200 @@ class EnhancedDiscoveryProcessor:
         if server_id not in self.dependency_map:
             return 0.0
             
-        total_latency = sum(
-            attr['latency']
-            for attr in self.dependency_map[server_id]['attributes'].values()
-        )
+        edges = self.dependency_map.edge_range(self.dependency_map.node(server_id))
+        total_latency = sum(self.dependency_map.latencies[edges.start:edges.stop])
         return min(1.0, total_latency / 1000)
 
     def calculate_security_impact(self, server_id: str) -> float:
         """Calculate security impact"""
         return 0.5  # Placeholder - implement actual security impact calculation
 
-    def get_security_info(self, server_id: str) -> dict:
+    def get_security_info(self, server_id: str, applications: List[dict] = None) -> dict:
         """Get security information"""
         try:
+            vulnerabilities = self.scan_vulnerabilities(server_id, applications)
             return {
-                'vulnerabilities': self.scan_vulnerabilities(server_id),
-                'compliance': self.check_compliance(server_id),
-                'patches': self.get_patch_status(server_id)
+                'vulnerabilities': vulnerabilities,
+                'compliance': self.check_compliance(server_id, vulnerabilities),
+                'patches': self.get_patch_status(server_id, vulnerabilities)
             }
         except Exception as e:
             print(f"Error getting security info: {str(e)}")
             return {}
 
+    def scan_vulnerabilities(self, server_id: str, applications: List[dict] = None) -> List[dict]:
+        """Match a server's installed applications against the local CVE index"""
+        if applications is None:
+            applications = self.get_application_details(server_id)
+
+        index = get_vulnerability_index()
+        findings = []
+        for app in applications:
+            for vulnerability in index.match(app['name'], app['version']):
+                findings.append({
+                    **vulnerability,
+                    'application': app['name'],
+                    'version': app['version']
+                })
+        return findings
+
+    def check_compliance(self, server_id: str, vulnerabilities: List[dict] = None) -> dict:
+        """Check a server against the vulnerability policy: no known critical or high CVEs"""
+        if vulnerabilities is None:
+            vulnerabilities = self.scan_vulnerabilities(server_id)
+
+        counts = {'critical': 0, 'high': 0, 'medium': 0, 'low': 0, 'unknown': 0}
+        for vulnerability in vulnerabilities:
+            severity = vulnerability['severity']
+            counts[severity if severity in counts else 'unknown'] += 1
+
+        violations = []
+        for severity in ('critical', 'high'):
+            ids = sorted({v['id'] for v in vulnerabilities if v['severity'] == severity})
+            if ids:
+                violations.append({
+                    'name': f'{severity.capitalize()} Vulnerabilities',
+                    'severity': severity,
+                    'details': f"Known {severity} vulnerabilities: {', '.join(ids)}",
+                    'remediation': 'Upgrade the affected applications to fixed versions'
+                })
+
+        return {
+            'status': 'non_compliant' if violations else 'compliant',
+            'vulnerability_counts': counts,
+            'violations': violations
+        }
+
+    def get_patch_status(self, server_id: str, vulnerabilities: List[dict] = None) -> dict:
+        """Get the application upgrades that would fix a server's known vulnerabilities"""
+        if vulnerabilities is None:
+            vulnerabilities = self.scan_vulnerabilities(server_id)
+
+        severity_rank = {'critical': 4, 'high': 3, 'medium': 2, 'low': 1}
+        pending = {}
+        unfixed = 0
+        for vulnerability in vulnerabilities:
+            if not vulnerability.get('fixedVersion'):
+                unfixed += 1
+                continue
+
+            key = (vulnerability['application'], vulnerability['version'])
+            patch = pending.setdefault(key, {
+                'application': vulnerability['application'],
+                'currentVersion': vulnerability['version'],
+                'targetVersion': vulnerability['fixedVersion'],
+                'severity': vulnerability['severity'],
+                'fixes': []
+            })
+            patch['fixes'].append(vulnerability['id'])
+
+            # One upgrade to the highest fixed version covers every CVE of the application
+            if (VulnerabilityIndex.version_key(vulnerability['fixedVersion'])
+                    > VulnerabilityIndex.version_key(patch['targetVersion'])):
+                patch['targetVersion'] = vulnerability['fixedVersion']
+            if (severity_rank.get(vulnerability['severity'], 0)
+                    > severity_rank.get(patch['severity'], 0)):
+                patch['severity'] = vulnerability['severity']
+
+        if not vulnerabilities:
+            status = 'up-to-date'
+        elif pending:
+            status = 'updates-available'
+        else:
+            status = 'no-fix-available'
+
+        return {
+            'status': status,
+            'pending': list(pending.values()),
+            'unfixed_vulnerabilities': unfixed
+        }
+
     def get_network_topology(self, server_id: str) -> dict:
         """Get network topology information"""
+        network_info = self.fetch_network_info(server_id)
+        if network_info is None:
+            return {}
+        return self.format_network_topology(
+            network_info,
+            self.detect_fleet_anomalies([network_info])[0],
+            self.index_network_interfaces(server_id, network_info)
+        )
+
+    def fetch_network_info(self, server_id: str) -> List[dict]:
+        """Get the raw network interfaces of a server"""
+        try:
+            return self._discovery_items(
+                'describe_server_network_info', 'networkInfo', server_id
+            )
+        except Exception as e:
+            self.record_fetch_failure(server_id, 'network', e)
+            return None
+
+    def index_network_interfaces(self, server_id: str, network_info: List[dict]) -> List[dict]:
+        """Analyze a server's network interfaces and add their addresses to the fleet IP index"""
+        if network_info is None:
+            return None
+        try:
+            interfaces = self.analyze_network_interfaces(network_info)
+        except Exception as e:
+            print(f"Error analyzing network interfaces of {server_id}: {str(e)}")
+            return None
+        self.ip_index.add_interfaces(server_id, interfaces)
+        return interfaces
+
+    def format_network_topology(self, network_info: List[dict], anomalies: List[dict],
+                                interfaces: List[dict] = None,
+                                aggregators: List[TrafficAggregator] = None) -> dict:
+        """Analyze raw network interfaces and their detected anomalies into the record format"""
         try:
-            network_info = self.discovery.describe_server_network_info(
-                serverIds=[server_id]
-            )['networkInfo']
-            
             return {
-                'interfaces': self.analyze_network_interfaces(network_info),
+                'interfaces': (interfaces if interfaces is not None
+                               else self.analyze_network_interfaces(network_info)),
                 'connectivity': self.analyze_connectivity(network_info),
-                'traffic_patterns': self.analyze_traffic_patterns(network_info)
+                'traffic_patterns': self.analyze_traffic_patterns(network_info, anomalies, aggregators)
             }
         except Exception as e:
             print(f"Error getting network topology: {str(e)}")
             return {}
 
+    def detect_fleet_anomalies(self, fleet_network_info: List[List[dict]]) -> List[List[dict]]:
+        """Detect traffic anomalies on every interface of many servers in one pass"""
+        return self.profile_fleet_traffic(fleet_network_info)[1]
+
+    def profile_fleet_traffic(self, fleet_network_info: List[List[dict]]) -> tuple:
+        """Get per-interface traffic aggregators and per-server anomalies of many servers
+
+        Each throughput sample is parsed once and fed to both its interface's aggregator and
+        the fleet's anomaly detector.
+        """
+        detector = TrafficAnomalyDetector()
+        fleet_aggregators = []
+        for index, network_info in enumerate(fleet_network_info):
+            aggregators = []
+            for interface in network_info or []:
+                aggregator = TrafficAggregator()
+                series = detector.add_series((index, interface.get('networkInterfaceId', '')))
+                for timestamp, throughput in self._throughput_samples(interface):
+                    aggregator.add(timestamp, throughput)
+                    detector.update(series, timestamp, throughput)
+                aggregators.append(aggregator)
+            fleet_aggregators.append(aggregators)
+
+        anomalies = [[] for _ in fleet_network_info]
+        for (index, interface_id), found in zip(detector.keys, detector.finish()):
+            for anomaly in found:
+                anomalies[index].append({'interface': interface_id, **anomaly})
+        for server_anomalies in anomalies:
+            server_anomalies.sort(key=lambda anomaly: anomaly['timestamp'])
+        return fleet_aggregators, anomalies
+
     def store_raw_data(self, server_data: dict):
         """Store raw server data in S3"""
+        # During a collection run records go to the write-behind archiver
+        if self.archiver is not None:
+            self.archiver.add(server_data)
+            return
+
         try:
             self.s3.put_object(
                 Bucket=os.environ.get('S3_BUCKET'),
@@ -466,55 +3074,53 @@ class EnhancedDiscoveryProcessor:
             }
         }]
 
-    def assess_compliance(self, server_details: dict) -> dict:
+    def assess_compliance(self, record: dict) -> dict:
         """Assess server compliance with security standards"""
-        compliance_status = {
-            'status': 'compliant',
-            'checks': [],
-            'violations': [],
-            'recommendations': []
-        }
+        return self.evaluate_compliance([record])[0]
 
-        # OS Version Check
-        os_version = server_details.get('osInfo', {}).get('version', '')
-        if os_version:
-            if self._is_os_version_supported(os_version):
-                compliance_status['checks'].append({
-                    'name': 'OS Version',
-                    'status': 'passed',
-                    'details': f'Running supported OS version: {os_version}'
-                })
-            else:
-                compliance_status['status'] = 'non_compliant'
-                compliance_status['violations'].append({
-                    'name': 'OS Version',
-                    'severity': 'high',
-                    'details': f'Unsupported OS version: {os_version}',
-                    'remediation': 'Upgrade to a supported OS version'
-                })
+    def evaluate_compliance(self, records: List[dict]) -> List[dict]:
+        """Assess many server records against the compiled compliance rules"""
+        rule_set = get_compliance_rules()
 
-        # Resource Utilization Check
-        if 'metrics' in server_details:
-            metrics = server_details['metrics']
-            if metrics.get('cpu', {}).get('utilization', 0) > 80:
-                compliance_status['violations'].append({
-                    'name': 'Resource Utilization',
-                    'severity': 'medium',
-                    'details': 'CPU utilization exceeds recommended threshold',
-                    'remediation': 'Consider resource optimization or scaling'
-                })
+        outcomes = rule_set.evaluate(records, self.compliance_memo, self.COMPLIANCE_MEMO_SIZE)
 
-        # Security Updates Check
-        patches = self.get_patch_status(server_details.get('serverId', ''))
-        if patches.get('status') != 'up-to-date':
-            compliance_status['violations'].append({
-                'name': 'Security Updates',
-                'severity': 'high',
-                'details': 'System is missing security updates',
-                'remediation': 'Apply all pending security updates'
-            })
+        assessments = []
+        for row in outcomes:
+            compliance_status = {
+                'status': 'compliant',
+                'checks': [],
+                'violations': [],
+                'recommendations': [],
+                'ruleSetVersion': rule_set.version
+            }
+            for compiled, outcome in zip(rule_set.rules, row):
+                # Rules whose field is missing from the record are not applicable
+                if outcome is None:
+                    continue
 
-        return compliance_status
+                rule = compiled['rule']
+                passed, value = outcome
+                if passed:
+                    compliance_status['checks'].append({
+                        'name': rule['name'],
+                        'status': 'passed',
+                        'details': rule.get('passed', '').format(value=value)
+                    })
+                    continue
+
+                compliance_status['violations'].append({
+                    'name': rule['name'],
+                    'severity': rule.get('severity', 'medium'),
+                    'details': rule.get('failed', '').format(value=value),
+                    'remediation': rule.get('remediation', '')
+                })
+                if rule.get('severity') in ('critical', 'high'):
+                    compliance_status['status'] = 'non_compliant'
+                recommendations = compliance_status['recommendations']
+                if rule.get('remediation') and rule['remediation'] not in recommendations:
+                    recommendations.append(rule['remediation'])
+            assessments.append(compliance_status)
+        return assessments
 
     def analyze_network_interfaces(self, network_info: List[dict]) -> List[dict]:
         """Analyze network interface configurations"""
@@ -537,22 +3143,106 @@ class EnhancedDiscoveryProcessor:
                     'groups': interface.get('securityGroups', []),
                     'acls': interface.get('networkAcls', [])
                 },
+                'subnet': {
+                    'id': interface.get('subnetId', ''),
+                    'cidr': interface.get('subnetCidr', '')
+                },
+                'open_ports': interface.get('openPorts'),
                 'status': interface.get('status', 'unknown'),
                 'performance': self._analyze_interface_performance(interface)
             }
             interfaces.append(interface_analysis)
         return interfaces
 
-    def analyze_traffic_patterns(self, network_info: List[dict]) -> dict:
+    def analyze_traffic_patterns(self, network_info: List[dict], anomalies: List[dict] = None,
+                                 aggregators: List[TrafficAggregator] = None) -> dict:
         """Analyze network traffic patterns"""
+        if aggregators is None:
+            aggregators = [self.aggregate_interface_traffic(interface) for interface in network_info]
+        profile = self._weekly_traffic_profile(aggregators)
+        capacity = sum(interface.get('maximumThroughput', 0) or 0 for interface in network_info)
         return {
             'patterns': {
-                'hourly': self._analyze_hourly_patterns(network_info),
-                'daily': self._analyze_daily_patterns(network_info)
+                'hourly': self._analyze_hourly_patterns(profile, capacity),
+                'daily': self._analyze_daily_patterns(profile, capacity)
             },
-            'peak_times': self._identify_peak_times(network_info),
-            'bandwidth_usage': self._analyze_bandwidth_usage(network_info),
-            'anomalies': self._detect_traffic_anomalies(network_info)
+            'peak_times': self._identify_peak_times(profile),
+            'bandwidth_usage': self._analyze_bandwidth_usage(network_info, aggregators),
+            'anomalies': (anomalies if anomalies is not None
+                          else self._detect_traffic_anomalies(network_info))
+        }
+
+    def aggregate_interface_traffic(self, interface: dict) -> TrafficAggregator:
+        """Stream an interface's throughput history into hour-of-week accumulators"""
+        aggregator = TrafficAggregator()
+        for timestamp, throughput in self._throughput_samples(interface):
+            aggregator.add(timestamp, throughput)
+        return aggregator
+
+    def _throughput_samples(self, interface: dict):
+        """Yield an interface's throughput history as (naive UTC time, value), skipping bad samples"""
+        skipped = 0
+        for sample in interface.get('throughputHistory') or []:
+            try:
+                if isinstance(sample, dict):
+                    timestamp, throughput = sample.get('timestamp'), sample.get('throughput')
+                else:
+                    timestamp, throughput = sample
+                parsed = (self._parse_timestamp(timestamp), float(throughput))
+            except (TypeError, ValueError):
+                skipped += 1
+                continue
+            yield parsed
+
+        if skipped:
+            print(f"Skipped {skipped} malformed throughput samples of "
+                  f"{interface.get('networkInterfaceId', 'unknown interface')}")
+
+    def analyze_connectivity(self, network_info: List[dict]) -> dict:
+        """Summarize how a server is reachable through its interfaces"""
+        private_ips = [i['privateIpAddress'] for i in network_info if i.get('privateIpAddress')]
+        public_ips = [i['publicIpAddress'] for i in network_info if i.get('publicIpAddress')]
+        security_groups = sorted({
+            group for interface in network_info for group in interface.get('securityGroups', [])
+        })
+        return {
+            'interface_count': len(network_info),
+            'private_ips': private_ips,
+            'public_ips': public_ips,
+            'internet_facing': bool(public_ips),
+            'security_groups': security_groups,
+            'connections': self.resolve_connections(network_info)
+        }
+
+    def resolve_connections(self, network_info: List[dict]) -> dict:
+        """Resolve the remote endpoints of a server's connections to servers and subnets"""
+        peers, subnets = {}, {}
+        external = 0
+        resolved = {}
+        for interface in network_info:
+            for connection in interface.get('connections') or []:
+                address = connection.get('remoteAddress') if isinstance(connection, dict) else connection
+                if address not in resolved:
+                    resolved[address] = self.ip_index.resolve(address)
+
+                match = resolved[address]
+                if match is None:
+                    external += 1
+                elif match['type'] == 'server':
+                    peers[match['serverId']] = peers.get(match['serverId'], 0) + 1
+                else:
+                    subnet = subnets.setdefault(match['cidr'], {
+                        'subnetId': match['subnetId'], 'cidr': match['cidr'], 'connections': 0
+                    })
+                    subnet['connections'] += 1
+
+        return {
+            'peers': [
+                {'serverId': server_id, 'connections': count}
+                for server_id, count in sorted(peers.items(), key=lambda peer: -peer[1])
+            ],
+            'subnets': sorted(subnets.values(), key=lambda subnet: -subnet['connections']),
+            'external': external
         }
 
     def _calculate_throughput_utilization(self, interface: dict) -> float:
@@ -570,53 +3260,152 @@ class EnhancedDiscoveryProcessor:
             'status': 'healthy' if interface.get('errorRate', 0) < 1 else 'degraded'
         }
 
-    def _analyze_hourly_patterns(self, network_info: List[dict]) -> dict:
+    def _weekly_traffic_profile(self, aggregators: List[TrafficAggregator]) -> dict:
+        """Combine interface accumulators into server throughput per hour of week"""
+        cells = range(TrafficAggregator.HOURS_PER_WEEK)
+        return {
+            # Interfaces carry traffic side by side, so means add up and summed peaks bound the peak
+            'averages': [sum(a.average(cell) for a in aggregators) for cell in cells],
+            'peaks': [sum(a.peaks[cell] for a in aggregators) for cell in cells],
+            'observed': [any(a.counts[cell] for a in aggregators) for cell in cells]
+        }
+
+    def _traffic_load(self, throughput: float, capacity: float, busiest: float) -> str:
+        """Classify throughput against interface capacity, or the busiest hour when it is unknown"""
+        reference = capacity or busiest
+        ratio = throughput / reference if reference else 0
+        return 'high' if ratio >= 0.7 else 'medium' if ratio >= 0.3 else 'low'
+
+    def _hour_averages(self, profile: dict, days: range) -> List[float]:
+        """Get the mean throughput of each hour of day over the observed cells of some weekdays"""
+        averages = []
+        for hour in range(24):
+            values = [profile['averages'][day * 24 + hour] for day in days
+                      if profile['observed'][day * 24 + hour]]
+            averages.append(sum(values) / len(values) if values else 0.0)
+        return averages
+
+    def _analyze_hourly_patterns(self, profile: dict, capacity: float) -> dict:
         """Analyze hourly network traffic patterns"""
+        averages = self._hour_averages(profile, range(7))
+        busiest = max(averages)
         hourly_data = {}
         for hour in range(24):
             hourly_data[str(hour)] = {
-                'average_throughput': 0,
-                'peak_throughput': 0,
-                'typical_load': 'low'
+                'average_throughput': round(averages[hour], 2),
+                'peak_throughput': round(max(profile['peaks'][day * 24 + hour] for day in range(7)), 2),
+                'typical_load': self._traffic_load(averages[hour], capacity, busiest)
             }
         return hourly_data
 
-    def _analyze_daily_patterns(self, network_info: List[dict]) -> dict:
+    def _analyze_daily_patterns(self, profile: dict, capacity: float) -> dict:
         """Analyze daily network traffic patterns"""
-        return {
-            'weekday': {
-                'average_throughput': 0,
-                'peak_hours': [],
-                'typical_load': 'medium'
-            },
-            'weekend': {
-                'average_throughput': 0,
-                'peak_hours': [],
-                'typical_load': 'low'
+        busiest = max(profile['averages'])
+        patterns = {}
+        for name, days in (('weekday', range(5)), ('weekend', range(5, 7))):
+            averages = self._hour_averages(profile, days)
+            observed = [
+                hour for hour in range(24)
+                if any(profile['observed'][day * 24 + hour] for day in days)
+            ]
+            average = sum(averages[hour] for hour in observed) / len(observed) if observed else 0.0
+            patterns[name] = {
+                'average_throughput': round(average, 2),
+                'peak_hours': sorted(observed, key=lambda hour: -averages[hour])[:3],
+                'typical_load': self._traffic_load(average, capacity, busiest)
             }
-        }
+        return patterns
 
-    def _identify_peak_times(self, network_info: List[dict]) -> List[dict]:
-        """Identify network traffic peak times"""
-        return [
-            {
-                'hour': 14,
-                'day': 'Monday',
-                'throughput': 850,
+    def _identify_peak_times(self, profile: dict, threshold: float = 0.8, limit: int = 5) -> List[dict]:
+        """Identify weekly windows of consecutive hours within threshold of the busiest hour"""
+        averages = profile['averages']
+        busiest = max(averages)
+        if busiest <= 0:
+            return []
+
+        hot = [average >= threshold * busiest for average in averages]
+        cells = len(hot)
+        if all(hot):
+            starts = [0]
+        else:
+            # Windows may wrap from Sunday night into Monday
+            starts = [cell for cell in range(cells) if hot[cell] and not hot[cell - 1]]
+
+        day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+        windows = []
+        for start in starts:
+            length = 1
+            while length < cells and hot[(start + length) % cells]:
+                length += 1
+            window = [(start + offset) % cells for offset in range(length)]
+            windows.append({
+                'hour': start % 24,
+                'day': day_names[start // 24],
+                'duration_hours': length,
+                'throughput': round(sum(averages[cell] for cell in window) / length, 2),
+                'peak_throughput': round(max(profile['peaks'][cell] for cell in window), 2),
                 'frequency': 'weekly'
+            })
+        return sorted(windows, key=lambda window: -window['throughput'])[:limit]
+
+    def _analyze_bandwidth_usage(self, network_info: List[dict],
+                                 aggregators: List[TrafficAggregator]) -> dict:
+        """Profile each interface's bandwidth from its throughput distribution"""
+        interfaces = []
+        for interface, aggregator in zip(network_info, aggregators):
+            capacity = interface.get('maximumThroughput', 0) or 0
+            p95 = aggregator.sketch.quantile(0.95)
+            interfaces.append({
+                'id': interface.get('networkInterfaceId', ''),
+                'samples': len(aggregator),
+                'average': round(aggregator.mean(), 2),
+                'p50': round(aggregator.sketch.quantile(0.5), 2),
+                'p95': round(p95, 2),
+                'p99': round(aggregator.sketch.quantile(0.99), 2),
+                'peak': round(aggregator.sketch.max, 2) if len(aggregator) else 0,
+                'capacity': capacity,
+                'p95_utilization': round(p95 / capacity * 100, 2) if capacity else 0
+            })
+
+        average = sum(profile['average'] for profile in interfaces)
+        capacity = sum(profile['capacity'] for profile in interfaces)
+        return {
+            'interfaces': interfaces,
+            'total': {
+                'average': round(average, 2),
+                'capacity': capacity,
+                'utilization': round(average / capacity * 100, 2) if capacity else 0
             }
-        ]
+        }
 
     def _detect_traffic_anomalies(self, network_info: List[dict]) -> List[dict]:
         """Detect network traffic anomalies"""
-        return [
-            {
-                'timestamp': '2024-01-15T10:00:00Z',
-                'type': 'spike',
-                'magnitude': 'high',
-                'duration': 300
-            }
-        ]
+        return self.detect_fleet_anomalies([network_info])[0]
+
+def get_processor(body: dict) -> EnhancedDiscoveryProcessor:
+    """Get the warm-container processor, rebuilding it when its state is invalidated"""
+    global _processor, _processor_created
+
+    # Graph state is dropped when it is too old, too large, or the caller asks for a refresh
+    ttl = float(os.environ.get('PROCESSOR_STATE_TTL', '900'))
+    max_edges = int(os.environ.get('PROCESSOR_MAX_GRAPH_EDGES', '2000000'))
+    now = time.monotonic()
+    if (_processor is None or body.get('refresh')
+            or now - _processor_created > ttl
+            or _processor.dependency_map.edge_count > max_edges):
+        _processor = EnhancedDiscoveryProcessor(
+            batch_mode=body.get('batchMode'),
+            max_workers=body.get('concurrency')
+        )
+        _processor_created = now
+    else:
+        _processor.configure(
+            batch_mode=body.get('batchMode'),
+            max_workers=body.get('concurrency')
+        )
+
+    _processor.throttle.reset_counters()
+    return _processor
 
 def lambda_handler(event, context):
     """Lambda handler for the discovery processor"""
@@ -624,23 +3413,88 @@ def lambda_handler(event, context):
         # Parse input
         body = json.loads(event.get('body', '{}'))
         server_id = body.get('serverId')
+        server_ids = list(dict.fromkeys(body.get('serverIds') or ([server_id] if server_id else [])))
         
-        # Initialize processor
-        processor = EnhancedDiscoveryProcessor()
-        
-        # Generate discovery report
-        discovery_data = processor.collect_advanced_server_data(server_id)
+        # Reuse the warm processor and its dependency graph when still valid
+        processor = get_processor(body)
         
+        # Fleet runs stream records into the S3 archive and return a pointer to the run manifest;
+        # only per-server requests return their records inline
+        results = []
+        error = None
+        try:
+            if server_ids:
+                # Per-server analysis requests read through the discovery table cache
+                results = processor.collect_server_results(
+                    server_ids, bypass_cache=bool(body.get('bypassCache'))
+                )
+            else:
+                incremental = body.get(
+                    'incremental',
+                    os.environ.get('DISCOVERY_INCREMENTAL', 'false').lower() == 'true'
+                )
+                for _ in processor.stream_server_records(incremental=incremental,
+                                                         skip_unchanged=True):
+                    pass
+        except Exception as e:
+            print(f"Error collecting server data: {str(e)}")
+            error = f'Error collecting server data: {str(e)}'
+
+        # Records whose archive chunk failed to upload are missing from the manifest
+        if error is None and not server_ids and processor.archive_stats.get('errors'):
+            error = f"{processor.archive_stats['errors']} raw data archive writes failed"
+
+        summary = {
+            'status': 'complete',
+            'throttleStats': processor.throttle.snapshot(),
+            'archiveStats': processor.archive_stats,
+            'changeSummary': processor.change_summary,
+            'deltaSummary': processor.delta_summary
+        }
+        if server_ids:
+            summary['cacheSummary'] = processor.cache_summary
+        else:
+            summary['manifest'] = processor.archive_manifest
+        if IMPORT_PROFILE:
+            summary['importProfile'] = IMPORT_TIMINGS
+
+        if error is not None:
+            summary['status'] = 'partial' if summary.get('manifest') or results else 'failed'
+            summary['error'] = error
+            return {
+                'statusCode': 500,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps(summary)
+            }
+
+        if not server_ids:
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Successfully processed server discovery data',
+                    **summary
+                })
+            }
+
         return {
             'statusCode': 200,
             'headers': {
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*'
             },
-            'body': json.dumps({
-                'message': 'Successfully processed server discovery data',
-                'results': discovery_data
-            })
+            'body': '{"message": %s, "results": [%s], %s' % (
+                json.dumps('Successfully processed server discovery data'),
+                ', '.join(results),
+                # Remaining fields, spliced in after the pre-serialized results
+                json.dumps(summary)[1:]
+            )
         }
         
     except Exception as e:
@@ -653,4 +3507,6 @@ def lambda_handler(event, context):
             'body': json.dumps({
                 'error': f'Error processing discovery request: {str(e)}'
             })
-        }
\ No newline at end of file
+        }
+
+record_import_time(__name__, time.perf_counter() - _MODULE_IMPORT_START)
@@ -1,5 +1,4 @@
 import json
-import boto3
 import os
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
@@ -7,7 +6,7 @@ from typing import Dict, List, Optional
 class EnhancedRoadmapGenerator:
     def __init__(self):
         """Initialize the roadmap generator"""
-        self.lambda_client = boto3.client('lambda')
+        self._lambda_client = None
         self.COST_ESTIMATOR_FUNCTION = os.environ.get('COST_ESTIMATOR_FUNCTION')
         self.risk_levels = {
             'Low': {'score': 1, 'multiplier': 1.0},
@@ -15,6 +14,14 @@ class EnhancedRoadmapGenerator:
             'High': {'score': 3, 'multiplier': 2.0}
         }
 
+    @property
+    def lambda_client(self):
+        """Lambda client, created only when a cost estimate is requested"""
+        if self._lambda_client is None:
+            import boto3
+            self._lambda_client = boto3.client('lambda')
+        return self._lambda_client
+
     def generate_migration_roadmap(self, servers: List[dict], start_date: Optional[str] = None) -> dict:
         """Generate comprehensive migration roadmap"""
         if not start_date:
@@ -56,6 +63,8 @@ class EnhancedRoadmapGenerator:
                 'risks': risks,
                 'mitigationStrategies': self.generate_mitigation_strategies(risks),
                 'costEstimate': cost_estimate,
+                'migrationStrategy': server.get('migrationStrategy', {}),
+                'complexity': server.get('complexity', {}),
                 'dependencies': server.get('dependencies', []),
                 'criticalPath': self.is_critical_path(server, sorted_servers)
             }
@@ -380,14 +389,32 @@ class EnhancedRoadmapGenerator:
         return strategies
 
     def get_cost_estimate(self, server: dict) -> dict:
-        """Get cost estimate from cost estimator Lambda"""
+        """Get one-time migration costs from cost estimator Lambda"""
         try:
+            # The cost estimator takes an API Gateway event, with application names
+            server_data = dict(server, applications=[
+                app.get('name', '') if isinstance(app, dict) else app
+                for app in server.get('applications', [])
+            ])
             response = self.lambda_client.invoke(
                 FunctionName=self.COST_ESTIMATOR_FUNCTION,
                 InvocationType='RequestResponse',
-                Payload=json.dumps({'serverData': server})
+                Payload=json.dumps({'body': json.dumps({'serverData': server_data})})
             )
-            return json.loads(response['Payload'].read())
+            result = json.loads(response['Payload'].read())
+            estimate = json.loads(result.get('body', '{}'))
+            if result.get('statusCode') != 200:
+                raise ValueError(estimate.get('error', f"status {result.get('statusCode')}"))
+
+            one_time = estimate['oneTime']
+            breakdown = one_time['breakdown']
+            return {
+                'total': one_time['total'],
+                'monthly': estimate['monthly']['total'],
+                'infrastructure': breakdown['dataTransfer'],
+                'labor': breakdown['baseMigration'] + breakdown['testing'],
+                'training': breakdown['training']
+            }
         except Exception as e:
             print(f"Error getting cost estimate: {str(e)}")
             return {'total': 0, 'error': str(e)}
@@ -564,6 +591,59 @@ class EnhancedRoadmapGenerator:
         }
         return strategy_risks.get(phase_name, [])
 
+    def _get_replatform_mitigations(self, phase_name: str) -> List[dict]:
+        """Get mitigation strategies specific to replatform strategy"""
+        strategy_mitigations = {
+            'Assessment': [
+                {
+                    'category': 'Platform Compatibility',
+                    'actions': [
+                        'Run compatibility checks against the target platform',
+                        'Build a proof of concept for each platform change'
+                    ],
+                    'verification': 'Compatibility assessment sign-off'
+                }
+            ],
+            'Migration': [
+                {
+                    'category': 'Configuration Translation',
+                    'actions': [
+                        'Generate platform configuration from templates',
+                        'Validate translated configuration automatically'
+                    ],
+                    'verification': 'Configuration validation report'
+                }
+            ]
+        }
+        return strategy_mitigations.get(phase_name, [])
+
+    def _get_refactor_mitigations(self, phase_name: str) -> List[dict]:
+        """Get mitigation strategies specific to refactor strategy"""
+        strategy_mitigations = {
+            'Assessment': [
+                {
+                    'category': 'Architecture Review',
+                    'actions': [
+                        'Document the target architecture',
+                        'Review architectural changes with the architecture board'
+                    ],
+                    'verification': 'Architecture review approval'
+                }
+            ],
+            'Migration': [
+                {
+                    'category': 'Incremental Refactoring',
+                    'actions': [
+                        'Refactor one component at a time',
+                        'Run regression tests after each change',
+                        'Keep the legacy path available until cutover'
+                    ],
+                    'verification': 'Regression test results per component'
+                }
+            ]
+        }
+        return strategy_mitigations.get(phase_name, [])
+
     def get_phase_mitigation_strategies(self, phase_name: str, strategy: str) -> List[dict]:
         """Get mitigation strategies for phase risks"""
         mitigation_strategies = []
@@ -645,6 +725,74 @@ class EnhancedRoadmapGenerator:
             counts[strategy] = counts.get(strategy, 0) + 1
         return counts
 
+    def _count_servers_by_complexity(self, timeline: List[dict]) -> dict:
+        """Count servers by complexity level"""
+        counts = {level: 0 for level in self.risk_levels}
+        for entry in timeline:
+            level = entry.get('complexity', {}).get('level', 'Medium')
+            counts[level] = counts.get(level, 0) + 1
+        return counts
+
+    def _count_risks_by_level(self, all_risks: List[dict]) -> dict:
+        """Count risks by severity"""
+        counts = {level: 0 for level in self.risk_levels}
+        for risk in all_risks:
+            severity = risk.get('severity', 'Medium')
+            counts[severity] = counts.get(severity, 0) + 1
+        return counts
+
+    def _identify_top_risks(self, all_risks: List[dict], limit: int = 5) -> List[dict]:
+        """Identify the most severe risks, merging the same risk across servers"""
+        grouped = {}
+        for risk in all_risks:
+            key = (risk['category'], risk['type'], risk['description'])
+            if key not in grouped:
+                grouped[key] = dict(risk, occurrences=0)
+            grouped[key]['occurrences'] += 1
+
+        def rank(risk):
+            return (
+                self.risk_levels.get(risk['severity'], {}).get('score', 0),
+                self.risk_levels.get(risk.get('probability'), {}).get('score', 0),
+                risk['occurrences']
+            )
+
+        return sorted(grouped.values(), key=rank, reverse=True)[:limit]
+
+    def _analyze_dependencies(self, timeline: List[dict]) -> dict:
+        """Summarize dependencies between the servers in the roadmap"""
+        planned = {entry['server']['id'] for entry in timeline}
+        dependents = {}
+        total = 0
+        external = 0
+        for entry in timeline:
+            for dependency in entry.get('dependencies', []):
+                total += 1
+                if dependency['serverId'] in planned:
+                    dependents[dependency['serverId']] = dependents.get(dependency['serverId'], 0) + 1
+                else:
+                    external += 1
+
+        most_depended = sorted(dependents.items(), key=lambda item: item[1], reverse=True)[:5]
+        return {
+            'total': total,
+            'serversWithDependencies': sum(1 for entry in timeline if entry.get('dependencies')),
+            'external': external,
+            'mostDependedUpon': [
+                {'serverId': server_id, 'dependents': count} for server_id, count in most_depended
+            ]
+        }
+
+    def _identify_critical_path_summary(self, timeline: List[dict]) -> dict:
+        """Summarize the servers on the critical path"""
+        critical = [entry for entry in timeline if entry.get('criticalPath')]
+        return {
+            'total': len(critical),
+            'servers': [entry['server']['name'] for entry in critical],
+            'startDate': min((entry['startDate'] for entry in critical), default=None),
+            'endDate': max((entry['endDate'] for entry in critical), default=None)
+        }
+
     def _break_down_costs_by_category(self, timeline: List[dict]) -> dict:
         """Break down costs by category"""
         costs = {
@@ -715,6 +863,72 @@ class EnhancedRoadmapGenerator:
         
         return milestones
 
+    def generate_risk_management_plan(self, all_risks: List[dict]) -> dict:
+        """Generate the project-level risk management plan"""
+        by_level = self._count_risks_by_level(all_risks)
+        return {
+            'summary': {
+                'total': len(all_risks),
+                'byLevel': by_level
+            },
+            'topRisks': self._identify_top_risks(all_risks),
+            'reviewCadence': 'Weekly' if by_level.get('High', 0) else 'Bi-weekly',
+            'escalation': [
+                'Migration Team lead reviews new risks within 2 business days',
+                'High severity risks are escalated to the project sponsor',
+                'Risks blocking cutover trigger the rollback plan'
+            ],
+            'monitoring': [
+                'Track open risks in the project risk register',
+                'Review risk status at every phase gate',
+                'Reassess severity after each migration wave'
+            ]
+        }
+
+    def generate_recommendations(self, timeline: List[dict]) -> List[dict]:
+        """Generate project recommendations from the roadmap"""
+        recommendations = []
+        critical = sum(1 for entry in timeline if entry.get('criticalPath'))
+        if critical:
+            recommendations.append({
+                'category': 'Scheduling',
+                'priority': 'High',
+                'recommendation': (f"Schedule the {critical} critical path servers early "
+                                   "and rehearse their cutovers"),
+                'rationale': 'Critical servers have dependents or high utilization'
+            })
+
+        dependent = sum(1 for entry in timeline if len(entry.get('dependencies', [])) > 5)
+        if dependent:
+            recommendations.append({
+                'category': 'Dependencies',
+                'priority': 'Medium',
+                'recommendation': (f"Migrate the {dependent} servers with more than 5 dependencies "
+                                   "in the same wave as their dependencies"),
+                'rationale': 'Moving dependencies together avoids hybrid connectivity during cutover'
+            })
+
+        unknown_versions = sum(
+            1 for entry in timeline
+            if any(risk['category'] == 'Application' for risk in entry.get('risks', []))
+        )
+        if unknown_versions:
+            recommendations.append({
+                'category': 'Applications',
+                'priority': 'Medium',
+                'recommendation': (f"Confirm application versions on {unknown_versions} servers "
+                                   "before assessment"),
+                'rationale': 'Unknown versions hide compatibility issues in the cloud environment'
+            })
+
+        recommendations.append({
+            'category': 'Process',
+            'priority': 'Low',
+            'recommendation': 'Run a pilot migration of a low complexity server first',
+            'rationale': 'A pilot validates tooling and runbooks before critical migrations'
+        })
+        return recommendations
+
 def lambda_handler(event, context):
     """Lambda handler for the roadmap generator"""
     try: